@@ -0,0 +1 @@
+"""Load and latency benchmarks for content service"""
@@ -0,0 +1,127 @@
+"""Benchmark the csv parse stage of content ingest without a database
+
+Generates a csv upload and runs it through parse_upload in threads and on
+process pools of the given sizes, next to a per-row dateutil baseline, and
+prints rows/sec of each as JSON.
+
+    python -m benchmarks.parse --rows 200000 --processes 0,2,4
+"""
+import argparse
+import asyncio
+import csv
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from io import TextIOWrapper
+from typing import IO
+from dateutil import parser  # type: ignore
+from content_service.services import csv_ingest
+from content_service.services.csv_ingest import IngestStats, ParsePool, parse_upload
+import content_service.settings as Config
+
+DATE_STYLES: dict[str, str] = {
+    "iso": "%Y-%m-%dT%H:%M:%S",
+    "us": "%m/%d/%Y %H:%M",
+    "text": "%d %b %Y",
+}
+
+
+def write_upload(rows: int, date_style: str) -> IO[bytes]:
+    """temporary csv upload of `rows` rows"""
+
+    upload: IO[bytes] = tempfile.TemporaryFile()
+    text = TextIOWrapper(upload, encoding="UTF-8", newline="")  # type: ignore
+    writer = csv.writer(text)
+    writer.writerow(("title", "story", "publishedDate"))
+    published: datetime = datetime(2023, 1, 1)
+    for index in range(rows):
+        writer.writerow(
+            (
+                f"Bench Title {index}",
+                f"benchmark story {index} " * 20,
+                (published + timedelta(minutes=index)).strftime(
+                    DATE_STYLES[date_style]
+                ),
+            )
+        )
+    text.flush()
+    text.detach()
+    return upload
+
+
+def dateutil_baseline(upload: IO[bytes]) -> float:
+    """rows/sec of parsing every row with DictReader and dateutil"""
+
+    upload.seek(0)
+    text = TextIOWrapper(upload, encoding="UTF-8", newline="")  # type: ignore
+    started: float = time.perf_counter()
+    rows: int = 0
+    for row in csv.DictReader(text):
+        parser.parse(row["publishedDate"])
+        row["title"].lower().replace(" ", "_")
+        rows += 1
+    elapsed: float = time.perf_counter() - started
+    text.detach()
+    return rows / elapsed
+
+
+async def parse_stage(upload: IO[bytes], processes: int) -> dict:
+    """wall clock and per parser rows/sec of parse_upload"""
+
+    upload.seek(0)
+    csv_ingest.PARSE_POOL = ParsePool(processes)
+    Config.INGEST_PARALLEL_MIN_BYTES = 0
+    if processes:
+        # start the processes outside of the measurement
+        await asyncio.get_running_loop().run_in_executor(
+            csv_ingest.PARSE_POOL.executor(), time.sleep, 0
+        )
+    stats: IngestStats = IngestStats()
+    started: float = time.perf_counter()
+    async for _ in parse_upload(upload, "bench_user", stats):
+        pass
+    elapsed: float = time.perf_counter() - started
+    csv_ingest.PARSE_POOL.close()
+    return {
+        "processes": processes,
+        "rows": stats.rows_parsed,
+        "rowsRejected": stats.rows_rejected,
+        "dateFormat": stats.date_format,
+        "seconds": round(elapsed, 3),
+        "rowsPerSecond": round(stats.rows_parsed / elapsed, 2),
+        "parseRowsPerSecond": round(stats.parse_rows_per_second, 2),
+    }
+
+
+def main() -> None:
+    """run parse benchmark and print JSON report"""
+
+    cli = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    cli.add_argument("--rows", type=int, default=200000)
+    cli.add_argument("--date-style", choices=sorted(DATE_STYLES), default="iso")
+    cli.add_argument(
+        "--processes",
+        type=lambda value: [int(count) for count in value.split(",")],
+        default=[0, 2],
+    )
+    args = cli.parse_args()
+
+    upload: IO[bytes] = write_upload(args.rows, args.date_style)
+    report: dict = {
+        "rows": args.rows,
+        "dateStyle": args.date_style,
+        "dateutilRowsPerSecond": round(dateutil_baseline(upload), 2),
+        "results": [
+            asyncio.run(parse_stage(upload, processes)) for processes in args.processes
+        ],
+    }
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
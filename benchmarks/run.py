@@ -0,0 +1,282 @@
+"""Benchmark content service routes against a local postgres and upstream stubs
+
+Starts the upstream stubs and the content service app as subprocesses,
+seeds rows through the csv ingest path, then drives every route at fixed
+concurrency levels and prints throughput and latency percentiles as JSON.
+
+    python -m benchmarks.run --rows 20000 --concurrency 1,16,64 --output bench.json
+
+The database comes from the usual DB_* / ASYNC_DATABASE_URL settings and
+receives `bench_title_*` rows.
+"""
+import argparse
+import asyncio
+import csv
+import os
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Iterator
+import httpx
+from benchmarks.stubs import TITLE_PREFIX
+
+USER_ID: str = "bench_user"
+ROUTES: tuple[str, ...] = (
+    "/content",
+    "/content/new",
+    "/content/top",
+    "/content/{title}",
+)
+RequestFactory = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+def percentile(latencies: list[float], fraction: float) -> float:
+    """nearest rank percentile of sorted latencies in milliseconds"""
+
+    if not latencies:
+        return 0.0
+    index: int = min(int(len(latencies) * fraction), len(latencies) - 1)
+    return round(latencies[index] * 1000, 3)
+
+
+def write_csv(path: str, titles: range) -> None:
+    """csv upload in the format accepted by POST /content"""
+
+    published: datetime = datetime(2023, 1, 1)
+    with open(path, "w", encoding="UTF-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(("title", "story", "publishedDate"))
+        for index in titles:
+            writer.writerow(
+                (
+                    f"{TITLE_PREFIX}{index}",
+                    f"benchmark story {index} " * 20,
+                    (published + timedelta(minutes=index)).isoformat(),
+                )
+            )
+
+
+class Benchmark:
+    """single benchmark session"""
+
+    def __init__(self, args: argparse.Namespace, workdir: str) -> None:
+        self.args: argparse.Namespace = args
+        self.base_url: str = f"http://localhost:{args.app_port}"
+        self.workdir: str = workdir
+
+    @contextmanager
+    def serve(self) -> Iterator[None]:
+        """run upstream stubs and content service, terminated on exit"""
+
+        stub_host: str = f"localhost:{self.args.stub_port}"
+        env: dict[str, str] = {
+            **os.environ,
+            "USER_SERVICE_HOST": stub_host,
+            "USER_INTERACTION_HOST": stub_host,
+            "RANKING_REFRESH_INTERVAL": "5",
+        }
+        with subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.stubs",
+                "--port",
+                str(self.args.stub_port),
+                "--latency",
+                str(self.args.stub_latency),
+                "--failure-rate",
+                str(self.args.stub_failure_rate),
+                "--ranked",
+                str(min(self.args.rows, 1000)),
+            ]
+        ) as stubs, subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "content_service.server:app",
+                "--port",
+                str(self.args.app_port),
+                "--log-level",
+                "warning",
+            ],
+            env=env,
+        ) as app:
+            try:
+                yield
+            finally:
+                stubs.terminate()
+                app.terminate()
+
+    async def wait_ready(self, client: httpx.AsyncClient) -> None:
+        """poll content service until it answers"""
+
+        deadline: float = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                await client.get("/content-service/stats")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+        raise RuntimeError("content service did not start")
+
+    async def upload(self, client: httpx.AsyncClient, path: str) -> httpx.Response:
+        """POST csv file to the ingest endpoint"""
+
+        with open(path, "rb") as file:
+            return await client.post(
+                "/content",
+                params={"userID": USER_ID},
+                files={"content": ("content.csv", file, "text/csv")},
+                timeout=None,
+            )
+
+    async def seed(self, client: httpx.AsyncClient) -> dict:
+        """seed rows through the csv ingest path"""
+
+        path: str = os.path.join(self.workdir, "seed.csv")
+        write_csv(path, range(self.args.rows))
+        started: float = time.perf_counter()
+        response: httpx.Response = await self.upload(client, path)
+        response.raise_for_status()
+        return {
+            "rows": self.args.rows,
+            "seconds": round(time.perf_counter() - started, 3),
+            "response": response.json(),
+        }
+
+    def request_factory(self, route: str) -> RequestFactory:
+        """build a request generator for route"""
+
+        pages: int = max(self.args.rows // 100, 1)
+        params: dict[str, str] = {"userID": USER_ID}
+        if route == "/content":
+            path: str = os.path.join(self.workdir, "ingest.csv")
+            write_csv(path, range(self.args.ingest_rows))
+            return lambda client: self.upload(client, path)
+        if route == "/content/{title}":
+            return lambda client: client.get(
+                f"/content/{TITLE_PREFIX}{random.randrange(self.args.rows)}",
+                params=params,
+            )
+        return lambda client: client.get(
+            route, params={**params, "page": str(random.randint(1, pages))}
+        )
+
+    async def drive(
+        self, client: httpx.AsyncClient, route: str, concurrency: int
+    ) -> dict:
+        """send --requests requests to route from `concurrency` workers"""
+
+        send: RequestFactory = self.request_factory(route)
+        latencies: list[float] = []
+        errors: int = 0
+        remaining: int = self.args.requests
+
+        async def worker() -> None:
+            nonlocal errors, remaining
+            while remaining > 0:
+                remaining -= 1
+                started: float = time.perf_counter()
+                try:
+                    response: httpx.Response = await send(client)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        for _ in range(min(self.args.warmup, self.args.requests)):
+            await send(client)
+        started: float = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed: float = time.perf_counter() - started
+        latencies.sort()
+        return {
+            "route": route,
+            "concurrency": concurrency,
+            "requests": len(latencies),
+            "errors": errors,
+            "seconds": round(elapsed, 3),
+            "throughput": round(len(latencies) / elapsed, 2),
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+        }
+
+    async def run(self) -> dict:
+        """seed database and measure every route at every concurrency"""
+
+        limits = httpx.Limits(max_connections=max(self.args.concurrency))
+        async with httpx.AsyncClient(
+            base_url=self.base_url, limits=limits, timeout=30
+        ) as client:
+            await self.wait_ready(client)
+            seed: dict = await self.seed(client)
+            results: list[dict] = [
+                await self.drive(client, route, concurrency)
+                for route in self.args.routes
+                for concurrency in self.args.concurrency
+            ]
+        return {
+            "commit": subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                capture_output=True,
+                text=True,
+                check=False,
+            ).stdout.strip(),
+            "config": {
+                key: value for key, value in vars(self.args).items() if key != "output"
+            },
+            "seed": seed,
+            "results": results,
+        }
+
+
+def main() -> None:
+    """run benchmark and write JSON report"""
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument(
+        "--concurrency",
+        type=lambda value: [int(level) for level in value.split(",")],
+        default=[1, 16, 64],
+    )
+    parser.add_argument(
+        "--routes",
+        type=lambda value: value.split(","),
+        default=list(ROUTES),
+        help=f"comma separated subset of {','.join(ROUTES)}",
+    )
+    parser.add_argument("--ingest-rows", type=int, default=100)
+    parser.add_argument("--stub-latency", type=float, default=0.005)
+    parser.add_argument("--stub-failure-rate", type=float, default=0.0)
+    parser.add_argument("--stub-port", type=int, default=18000)
+    parser.add_argument("--app-port", type=int, default=19000)
+    parser.add_argument("--output", help="write report to file instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="content-bench-") as workdir:
+        benchmark: Benchmark = Benchmark(args, workdir)
+        with benchmark.serve():
+            report: dict = asyncio.run(benchmark.run())
+    if args.output:
+        with open(args.output, "w", encoding="UTF-8") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Stub user service and user interaction service for benchmarks"""
+import argparse
+import asyncio
+import random
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+import uvicorn
+
+TITLE_PREFIX: str = "bench_title_"
+
+
+class UpstreamStub:
+    """answers like the sibling services after `latency` seconds and
+    fails with 503 for `failure_rate` of the requests
+    """
+
+    PAGE_SIZE: int = 100
+
+    def __init__(self, latency: float, failure_rate: float, ranked: int) -> None:
+        self.latency: float = latency
+        self.failure_rate: float = failure_rate
+        self.ranked: int = ranked
+
+    async def _delay(self) -> JSONResponse | None:
+        """simulate upstream latency and failures"""
+
+        if self.latency:
+            await asyncio.sleep(random.expovariate(1 / self.latency))
+        if random.random() < self.failure_rate:
+            return JSONResponse({"error": "stub failure"}, status_code=503)
+        return None
+
+    async def user(self, request: Request) -> JSONResponse:
+        """user service GET /user/{user_id}"""
+
+        return await self._delay() or JSONResponse(
+            {"id": request.path_params["user_id"]}
+        )
+
+    async def contents(self, request: Request) -> JSONResponse:
+        """user interaction service GET /contents?page=N"""
+
+        failure = await self._delay()
+        if failure is not None:
+            return failure
+        page: int = int(request.query_params.get("page", "1"))
+        start: int = (page - 1) * self.PAGE_SIZE
+        return JSONResponse(
+            [
+                {
+                    "title": f"{TITLE_PREFIX}{rank}",
+                    "totalReads": self.ranked - rank,
+                    "totalLikes": (self.ranked - rank) // 2,
+                }
+                for rank in range(start, min(start + self.PAGE_SIZE, self.ranked))
+            ]
+        )
+
+    def app(self) -> Starlette:
+        """stub application serving both upstream apis"""
+
+        return Starlette(
+            routes=[
+                Route("/user/{user_id}", self.user, methods=["GET"]),
+                Route("/contents", self.contents, methods=["GET"]),
+            ]
+        )
+
+
+def main() -> None:
+    """serve upstream stubs until interrupted"""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--ranked", type=int, default=1000)
+    args = parser.parse_args()
+    stub = UpstreamStub(args.latency, args.failure_rate, args.ranked)
+    uvicorn.run(stub.app(), port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
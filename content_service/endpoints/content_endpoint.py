@@ -1,46 +1,96 @@
 """Handles endpoints for content service"""
-from typing import Final
-from httpx import ConnectError
+import asyncio
+import csv
+import json
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from typing import AsyncIterator, Final, Sequence
+from httpx import TransportError
+from sqlalchemy import Row
 from starlette.requests import Request
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response, StreamingResponse
 from starlette.datastructures import UploadFile
-from io import StringIO
 from content_service.exceptions import (
     MissingFileOrUserId,
     ContentDoesNotExistError,
+    IngestJobDoesNotExistError,
+    IngestQueueFull,
+    InvalidBatchRequest,
+    InvalidCsvFile,
+    InvalidCursorValue,
+    InvalidExportParams,
     InvalidPageValue,
-    InternalCommunication,
+    InvalidProjectionValue,
+    InvalidSearchQuery,
     UserDoesNotExistError,
+    UserServiceUnavailable,
+)
+from content_service.services.content_service import ContentNotFound, ContentService
+from content_service.services.csv_ingest import IngestStats, InvalidCsvError
+from content_service.services.cursor import InvalidCursorError, decode_cursor
+from content_service.services.http_cache import (
+    REVALIDATE,
+    http_date,
+    not_modified,
+    not_modified_response,
+    validate_page,
+    version_etag,
 )
-from content_service.services.content_service import ContentService
+from content_service.services.ingest_jobs import IngestJob, IngestJobManager
+from content_service.services.internal_client import INTERNAL_CLIENT
+from content_service.services.ranking import RankingRefresher
+from content_service.services.replicas import REPLICAS
+import content_service.settings as Config
 
-from content_service.models import ASYNC_DB_ENGINE
+from content_service.models import DATABASE
 
 
 class ContentEndpoint:
     """endpoint class to handle content services"""
 
-    svc: ContentService = ContentService(ASYNC_DB_ENGINE)
+    svc: ContentService = ContentService(DATABASE.session, INTERNAL_CLIENT, REPLICAS)
+    jobs: IngestJobManager = IngestJobManager(
+        svc.create_content_service,
+        Config.INGEST_WORKERS,
+        Config.INGEST_MAX_QUEUED,
+        Config.INGEST_JOB_HISTORY,
+    )
+    ranking: RankingRefresher = RankingRefresher(DATABASE.session, INTERNAL_CLIENT)
     BAD_REQUEST: Final[int] = 400
     SUCCESS: Final[int] = 200
     CREATED: Final[int] = 201
+    ACCEPTED: Final[int] = 202
+    EXPORT_MEDIA_TYPES: Final[dict[str, str]] = {
+        "csv": "text/csv",
+        "ndjson": "application/x-ndjson",
+    }
     NOT_FOUND: Final[int] = 404
     SERVER_ERROR: Final[int] = 500
+    SERVICE_UNAVAILABLE: Final[int] = 503
 
     @classmethod
     async def create_content(cls, request: Request) -> JSONResponse:
-        """Handles create content service"""
+        """Handles create content service
+        With `async=true` the upload is queued and a job id is returned
+        right away, otherwise the request waits for its ingest job.
+        """
 
         try:
             user_id: str = request.query_params["userID"]
+            run_async: bool = request.query_params.get("async", "") == "true"
             form_data = await request.form()
             assert isinstance(form_data["content"], UploadFile)
             csv_file: UploadFile = form_data["content"]
-            csv_data: StringIO = StringIO((await csv_file.read()).decode("UTF-8"))
-            data_count: int = await cls.svc.create_content_service(csv_data, user_id)
+            if run_async and not await cls.svc.user_exists(user_id):
+                raise ValueError
+            job: IngestJob = cls.jobs.submit(csv_file.file, user_id)
+            return await cls._job_response(job, run_async)
+        except asyncio.QueueFull:
             return JSONResponse(
-                {"msg": f"{data_count} data added"}, status_code=cls.CREATED
+                IngestQueueFull.error(), status_code=cls.SERVICE_UNAVAILABLE
             )
+        except InvalidCsvError:
+            return JSONResponse(InvalidCsvFile.error(), status_code=cls.BAD_REQUEST)
         except KeyError:
             return JSONResponse(
                 MissingFileOrUserId.error(), status_code=cls.BAD_REQUEST
@@ -49,20 +99,84 @@ class ContentEndpoint:
             return JSONResponse(
                 UserDoesNotExistError.error(), status_code=cls.NOT_FOUND
             )
+        except TransportError:
+            return JSONResponse(
+                UserServiceUnavailable.error(), status_code=cls.SERVICE_UNAVAILABLE
+            )
+
+    @classmethod
+    async def _job_response(cls, job: IngestJob, run_async: bool) -> JSONResponse:
+        """job id of a queued upload, or the result once its job finished
+        Errors of an awaited job are raised to create_content.
+        """
+
+        if run_async:
+            return JSONResponse(
+                job.to_dict(),
+                status_code=cls.ACCEPTED,
+                headers={"Location": f"/content/jobs/{job.job_id}"},
+            )
+        await job.done.wait()
+        if job.error is not None:
+            raise job.error
+        stats: IngestStats = job.stats
+        return JSONResponse(
+            {
+                "msg": f"{stats.rows_written} data added",
+                "rowsPerSecond": round(stats.rows_per_second, 2),
+                "parseRowsPerSecond": round(stats.parse_rows_per_second, 2),
+                "rowsRejected": stats.rows_rejected,
+                "rejections": stats.rejections,
+            },
+            status_code=cls.CREATED,
+        )
+
+    @classmethod
+    async def fetch_ingest_job(cls, request: Request) -> JSONResponse:
+        """Handles fetch ingest job progress"""
+
+        try:
+            user_id: str = request.query_params["userID"]
+            job: IngestJob | None = cls.jobs.get(request.path_params["job_id"])
+            if job is None or job.user_id != user_id:
+                return JSONResponse(
+                    IngestJobDoesNotExistError.error(), status_code=cls.NOT_FOUND
+                )
+            return JSONResponse(job.to_dict(), status_code=cls.SUCCESS)
+        except KeyError:
+            return JSONResponse(
+                MissingFileOrUserId.error(), status_code=cls.BAD_REQUEST
+            )
+
+    @staticmethod
+    def _content_headers(updated_at: datetime) -> dict[str, str]:
+        """validators of a single content, derived from its updatedAt"""
+
+        return {
+            "ETag": version_etag(updated_at),
+            "Last-Modified": http_date(updated_at),
+            "Cache-Control": REVALIDATE,
+        }
 
     @classmethod
     async def update_content(cls, request: Request) -> JSONResponse:
-        """Handles update content service"""
+        """Handles update content service
+        The response carries the ETag of the new version.
+        """
 
         try:
             user_id: str = request.query_params["userID"]
-            title: str = request.path_params["title"].lower().replace(" ", "_")
+            title: str = cls.svc.normalize_title(request.path_params["title"])
             body: dict[str, str] = await request.json()
             content = await cls.svc.update_content_service(
                 title, body["story"], user_id
             )
-            return JSONResponse(content, status_code=cls.SUCCESS)
-        except AttributeError:
+            return JSONResponse(
+                {"title": content["title"], "story": content["story"]},
+                status_code=cls.SUCCESS,
+                headers=cls._content_headers(content["updatedAt"]),  # type: ignore
+            )
+        except ContentNotFound:
             return JSONResponse(
                 ContentDoesNotExistError.error(), status_code=cls.NOT_FOUND
             )
@@ -74,6 +188,10 @@ class ContentEndpoint:
             return JSONResponse(
                 UserDoesNotExistError.error(), status_code=cls.NOT_FOUND
             )
+        except TransportError:
+            return JSONResponse(
+                UserServiceUnavailable.error(), status_code=cls.SERVICE_UNAVAILABLE
+            )
 
     @classmethod
     async def delete_content(cls, request: Request) -> JSONResponse:
@@ -81,10 +199,10 @@ class ContentEndpoint:
 
         try:
             user_id: str = request.query_params["userID"]
-            title: str = request.path_params["title"].lower().replace(" ", "_")
+            title: str = cls.svc.normalize_title(request.path_params["title"])
             await cls.svc.delete_content_service(title, user_id)
             return JSONResponse(None, status_code=cls.SUCCESS)
-        except AttributeError:
+        except ContentNotFound:
             return JSONResponse(
                 ContentDoesNotExistError.error(), status_code=cls.NOT_FOUND
             )
@@ -96,17 +214,33 @@ class ContentEndpoint:
             return JSONResponse(
                 UserDoesNotExistError.error(), status_code=cls.NOT_FOUND
             )
+        except TransportError:
+            return JSONResponse(
+                UserServiceUnavailable.error(), status_code=cls.SERVICE_UNAVAILABLE
+            )
 
     @classmethod
-    async def fetch_content(cls, request: Request) -> JSONResponse:
-        """Handles fetch content service"""
+    async def fetch_content(cls, request: Request) -> Response:
+        """Handles fetch content service
+        Responses carry a strong ETag and Last-Modified of the content
+        version, a matching If-None-Match or If-Modified-Since is answered
+        304 before the body is rendered.
+        """
 
         try:
             user_id: str = request.query_params["userID"]
-            title: str = request.path_params["title"].lower().replace(" ", "_")
-            content: dict[str, str] = await cls.svc.read_content_service(title, user_id)
-            return JSONResponse(content, status_code=cls.SUCCESS)
-        except AttributeError:
+            title: str = cls.svc.normalize_title(request.path_params["title"])
+            content = await cls.svc.read_content_service(title, user_id)
+            updated_at: datetime = content["updatedAt"]  # type: ignore
+            headers: dict[str, str] = cls._content_headers(updated_at)
+            if not_modified(request, headers["ETag"], updated_at):
+                return not_modified_response(headers)
+            return JSONResponse(
+                {"title": content["title"], "story": content["story"]},
+                status_code=cls.SUCCESS,
+                headers=headers,
+            )
+        except ContentNotFound:
             return JSONResponse(
                 ContentDoesNotExistError.error(), status_code=cls.NOT_FOUND
             )
@@ -118,20 +252,398 @@ class ContentEndpoint:
             return JSONResponse(
                 UserDoesNotExistError.error(), status_code=cls.NOT_FOUND
             )
+        except TransportError:
+            return JSONResponse(
+                UserServiceUnavailable.error(), status_code=cls.SERVICE_UNAVAILABLE
+            )
+
+    @staticmethod
+    async def _csv_chunks(
+        partitions: AsyncIterator[Sequence[Row]],
+    ) -> AsyncIterator[str]:
+        """render exported rows in the csv format accepted by create content"""
+
+        buffer: StringIO = StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(("title", "story", "publishedDate"))
+        yield buffer.getvalue()
+        async for rows in partitions:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(
+                (row.title, row.story, row.publishedDate.isoformat()) for row in rows
+            )
+            yield buffer.getvalue()
+
+    @staticmethod
+    async def _ndjson_chunks(
+        partitions: AsyncIterator[Sequence[Row]],
+    ) -> AsyncIterator[str]:
+        """render exported rows as one json document per line"""
+
+        async for rows in partitions:
+            yield "".join(
+                json.dumps(
+                    {
+                        "title": row.title,
+                        "story": row.story,
+                        "publishedDate": str(row.publishedDate),
+                        "userID": row.userID,
+                    }
+                )
+                + "\n"
+                for row in rows
+            )
+
+    @staticmethod
+    def _export_bound(value: str) -> datetime:
+        """ISO date bounding publishedDate, dates with an offset are
+        converted to UTC like naive publishedDate values
+        """
+
+        bound: datetime = datetime.fromisoformat(value)
+        if bound.tzinfo is not None:
+            bound = bound.astimezone(timezone.utc).replace(tzinfo=None)
+        return bound
+
+    @classmethod
+    async def export_content(cls, request: Request) -> Response:
+        """Handles streaming export of contents as csv or ndjson
+        `since` and `until` are ISO dates bounding publishedDate.
+        """
+
+        try:
+            export_format: str = request.query_params.get("format", "csv")
+            since: datetime | None = None
+            until: datetime | None = None
+            if "since" in request.query_params:
+                since = cls._export_bound(request.query_params["since"])
+            if "until" in request.query_params:
+                until = cls._export_bound(request.query_params["until"])
+            if export_format not in cls.EXPORT_MEDIA_TYPES:
+                raise ValueError(export_format)
+        except ValueError:
+            return JSONResponse(
+                InvalidExportParams.error(), status_code=cls.BAD_REQUEST
+            )
+        try:
+            user_id: str = request.query_params["userID"]
+            partitions = await cls.svc.export_content_service(user_id, since, until)
+            filename: str = f"content.{export_format}"
+            chunks: AsyncIterator[str] = (
+                cls._csv_chunks(partitions)
+                if export_format == "csv"
+                else cls._ndjson_chunks(partitions)
+            )
+            return StreamingResponse(
+                chunks,
+                media_type=cls.EXPORT_MEDIA_TYPES[export_format],
+                headers={"Content-Disposition": f"attachment; filename={filename}"},
+            )
+        except KeyError:
+            return JSONResponse(
+                MissingFileOrUserId.error(), status_code=cls.BAD_REQUEST
+            )
+        except ValueError:
+            return JSONResponse(
+                UserDoesNotExistError.error(), status_code=cls.NOT_FOUND
+            )
+        except TransportError:
+            return JSONResponse(
+                UserServiceUnavailable.error(), status_code=cls.SERVICE_UNAVAILABLE
+            )
+
+    @staticmethod
+    def _latest_cursor(cursor: str) -> tuple[datetime, str]:
+        """decode (timestamp, title) cursor of latest contents and changes"""
+
+        published, title = decode_cursor(cursor, 2)
+        try:
+            return datetime.fromisoformat(published), str(title)
+        except (TypeError, ValueError) as error:
+            raise InvalidCursorError(cursor) from error
 
     @classmethod
-    async def fetch_latest_content(cls, request: Request) -> JSONResponse:
-        """Handles fetch latest contents"""
+    async def fetch_contents(cls, request: Request) -> JSONResponse:
+        """Handles fetch many contents in one call
+        body -> {"titles": [...], "fields": [...]}, fields default to
+        title and story like the single content read.
+        """
 
         try:
             user_id: str = request.query_params["userID"]
-            page: str = request.query_params.get("page", "1")
-            content: list[dict[str, str]] = await cls.svc.read_latest_content(
-                int(page), user_id
+            body = await request.json()
+            titles = body["titles"]
+            fields = body.get("fields", ["title", "story"])
+            if not (
+                isinstance(titles, list)
+                and 0 < len(titles) <= Config.BATCH_MAX_TITLES
+                and all(isinstance(title, str) for title in titles)
+                and isinstance(fields, list)
+                and set(fields) <= set(cls.svc.CONTENT_FIELDS)
+            ):
+                return JSONResponse(
+                    InvalidBatchRequest.error(), status_code=cls.BAD_REQUEST
+                )
+            items, missing = await cls.svc.read_contents_service(
+                titles, user_id, fields
+            )
+            return JSONResponse(
+                {"items": items, "missing": missing}, status_code=cls.SUCCESS
+            )
+        except (
+            KeyError,
+            TypeError,
+            AttributeError,
+            json.JSONDecodeError,
+            UnicodeDecodeError,
+        ):
+            return JSONResponse(
+                InvalidBatchRequest.error(), status_code=cls.BAD_REQUEST
+            )
+        except ValueError:
+            return JSONResponse(
+                UserDoesNotExistError.error(), status_code=cls.NOT_FOUND
+            )
+        except TransportError:
+            return JSONResponse(
+                UserServiceUnavailable.error(), status_code=cls.SERVICE_UNAVAILABLE
+            )
+
+    @classmethod
+    async def update_contents(cls, request: Request) -> JSONResponse:
+        """Handles update of many contents in one call
+        body -> {"contents": [{"title": ..., "story": ...}, ...]}, up to
+        BATCH_MAX_MUTATIONS contents.
+        """
+
+        try:
+            user_id: str = request.query_params["userID"]
+            body = await request.json()
+            contents = body["contents"]
+            if not (
+                isinstance(contents, list)
+                and 0 < len(contents) <= Config.BATCH_MAX_MUTATIONS
+                and all(
+                    isinstance(content["title"], str)
+                    and isinstance(content["story"], str)
+                    for content in contents
+                )
+            ):
+                return JSONResponse(
+                    InvalidBatchRequest.error(), status_code=cls.BAD_REQUEST
+                )
+            updated, missing, failed = await cls.svc.update_contents_service(
+                [(content["title"], content["story"]) for content in contents],
+                user_id,
+            )
+            return JSONResponse(
+                {"updated": updated, "missing": missing, "failed": failed},
+                status_code=cls.SUCCESS,
             )
-            return JSONResponse(content, status_code=cls.SUCCESS)
+        except (
+            KeyError,
+            TypeError,
+            AttributeError,
+            json.JSONDecodeError,
+            UnicodeDecodeError,
+        ):
+            return JSONResponse(
+                InvalidBatchRequest.error(), status_code=cls.BAD_REQUEST
+            )
+        except ValueError:
+            return JSONResponse(
+                UserDoesNotExistError.error(), status_code=cls.NOT_FOUND
+            )
+        except TransportError:
+            return JSONResponse(
+                UserServiceUnavailable.error(), status_code=cls.SERVICE_UNAVAILABLE
+            )
+
+    @classmethod
+    async def delete_contents(cls, request: Request) -> JSONResponse:
+        """Handles delete of many contents in one call
+        body -> {"titles": [...]}, up to BATCH_MAX_MUTATIONS titles.
+        """
+
+        try:
+            user_id: str = request.query_params["userID"]
+            body = await request.json()
+            titles = body["titles"]
+            if not (
+                isinstance(titles, list)
+                and 0 < len(titles) <= Config.BATCH_MAX_MUTATIONS
+                and all(isinstance(title, str) for title in titles)
+            ):
+                return JSONResponse(
+                    InvalidBatchRequest.error(), status_code=cls.BAD_REQUEST
+                )
+            deleted, missing, failed = await cls.svc.delete_contents_service(
+                titles, user_id
+            )
+            return JSONResponse(
+                {"deleted": deleted, "missing": missing, "failed": failed},
+                status_code=cls.SUCCESS,
+            )
+        except (
+            KeyError,
+            TypeError,
+            AttributeError,
+            json.JSONDecodeError,
+            UnicodeDecodeError,
+        ):
+            return JSONResponse(
+                InvalidBatchRequest.error(), status_code=cls.BAD_REQUEST
+            )
+        except ValueError:
+            return JSONResponse(
+                UserDoesNotExistError.error(), status_code=cls.NOT_FOUND
+            )
+        except TransportError:
+            return JSONResponse(
+                UserServiceUnavailable.error(), status_code=cls.SERVICE_UNAVAILABLE
+            )
+
+    @staticmethod
+    def _search_cursor(cursor: str) -> tuple[float, str]:
+        """decode (rank, title) cursor of search results"""
+
+        rank, title = decode_cursor(cursor, 2)
+        if not isinstance(rank, (int, float)) or not isinstance(title, str):
+            raise InvalidCursorError(cursor)
+        return float(rank), title
+
+    @classmethod
+    async def search_content(cls, request: Request) -> Response:
+        """Handles full text search of contents
+        `after` takes the X-Next-Cursor header of the previous page.
+        """
+
+        try:
+            user_id: str = request.query_params["userID"]
+            search: str = request.query_params.get("q", "").strip()
+            if not search:
+                return JSONResponse(
+                    InvalidSearchQuery.error(), status_code=cls.BAD_REQUEST
+                )
+            after: tuple[float, str] | None = None
+            if "after" in request.query_params:
+                after = cls._search_cursor(request.query_params["after"])
+            content, next_cursor = await cls.svc.search_content_service(
+                search, user_id, after
+            )
+            headers: dict[str, str] = (
+                {"X-Next-Cursor": next_cursor} if next_cursor else {}
+            )
+            return validate_page(
+                request,
+                JSONResponse(content, status_code=cls.SUCCESS, headers=headers),
+            )
+        except InvalidCursorError:
+            return JSONResponse(InvalidCursorValue.error(), status_code=cls.BAD_REQUEST)
+        except KeyError:
+            return JSONResponse(
+                MissingFileOrUserId.error(), status_code=cls.BAD_REQUEST
+            )
+        except ValueError:
+            return JSONResponse(
+                UserDoesNotExistError.error(), status_code=cls.NOT_FOUND
+            )
+        except TransportError:
+            return JSONResponse(
+                UserServiceUnavailable.error(), status_code=cls.SERVICE_UNAVAILABLE
+            )
+
+    @classmethod
+    def _feed_projection(
+        cls, request: Request
+    ) -> tuple[tuple[str, ...], int | None] | None:
+        """parse `fields=a,b` and `excerpt=N` of feed endpoints,
+        None when either of them is invalid
+        """
+
+        fields: tuple[str, ...] = cls.svc.CONTENT_FIELDS
+        if "fields" in request.query_params:
+            fields = tuple(request.query_params["fields"].split(","))
+        excerpt: str | None = request.query_params.get("excerpt")
+        if not set(fields) <= set(cls.svc.CONTENT_FIELDS) or (
+            excerpt is not None and (not excerpt.isdigit() or int(excerpt) == 0)
+        ):
+            return None
+        return fields, (int(excerpt) if excerpt else None)
+
+    @classmethod
+    async def fetch_content_changes(cls, request: Request) -> Response:
+        """Handles fetch content changes
+        `since` takes the X-Next-Cursor header of the previous call, the
+        whole history is replayed without it. Consumers poll with the
+        last cursor until an empty page comes back.
+        """
+
+        try:
+            user_id: str = request.query_params["userID"]
+            since: tuple[datetime, str] | None = None
+            if "since" in request.query_params:
+                since = cls._latest_cursor(request.query_params["since"])
+            changes, next_cursor = await cls.svc.read_content_changes(user_id, since)
+            headers: dict[str, str] = (
+                {"X-Next-Cursor": next_cursor} if next_cursor else {}
+            )
+            return validate_page(
+                request,
+                JSONResponse(changes, status_code=cls.SUCCESS, headers=headers),
+            )
+        except InvalidCursorError:
+            return JSONResponse(InvalidCursorValue.error(), status_code=cls.BAD_REQUEST)
+        except KeyError:
+            return JSONResponse(
+                MissingFileOrUserId.error(), status_code=cls.BAD_REQUEST
+            )
+        except ValueError:
+            return JSONResponse(
+                UserDoesNotExistError.error(), status_code=cls.NOT_FOUND
+            )
+        except TransportError:
+            return JSONResponse(
+                UserServiceUnavailable.error(), status_code=cls.SERVICE_UNAVAILABLE
+            )
+
+    @classmethod
+    async def _latest_page(cls, request: Request, user_id: str) -> Response:
+        """page of latest contents asked for by the query of request"""
+
+        page: str = request.query_params.get("page", "1")
+        after: tuple[datetime, str] | None = None
+        if "after" in request.query_params:
+            after = cls._latest_cursor(request.query_params["after"])
+        projection = cls._feed_projection(request)
+        if projection is None:
+            return JSONResponse(
+                InvalidProjectionValue.error(), status_code=cls.BAD_REQUEST
+            )
+        content, next_cursor = await cls.svc.read_latest_content(
+            int(page), user_id, after, *projection
+        )
+        headers: dict[str, str] = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return validate_page(
+            request,
+            JSONResponse(content, status_code=cls.SUCCESS, headers=headers),
+        )
+
+    @classmethod
+    async def fetch_latest_content(cls, request: Request) -> Response:
+        """Handles fetch latest contents
+        `after` takes the X-Next-Cursor header of the previous page,
+        `fields` and `excerpt` trim every item of the page.
+        """
+
+        try:
+            user_id: str = request.query_params["userID"]
+            return await cls._latest_page(request, user_id)
         except TypeError:
             return JSONResponse(InvalidPageValue.error(), status_code=cls.BAD_REQUEST)
+        except InvalidCursorError:
+            return JSONResponse(InvalidCursorValue.error(), status_code=cls.BAD_REQUEST)
         except KeyError:
             return JSONResponse(
                 MissingFileOrUserId.error(), status_code=cls.BAD_REQUEST
@@ -140,24 +652,40 @@ class ContentEndpoint:
             return JSONResponse(
                 UserDoesNotExistError.error(), status_code=cls.NOT_FOUND
             )
+        except TransportError:
+            return JSONResponse(
+                UserServiceUnavailable.error(), status_code=cls.SERVICE_UNAVAILABLE
+            )
 
     @classmethod
-    async def fetch_top_content(cls, request: Request) -> JSONResponse:
-        """Handled fetch top contents"""
+    async def fetch_top_content(cls, request: Request) -> Response:
+        """Handled fetch top contents
+        X-Ranking-Age tells how many seconds old the reads and likes are,
+        `fields` and `excerpt` trim every item of the page.
+        """
 
         try:
             user_id: str = request.query_params["userID"]
             page: str = request.query_params.get("page", "1")
-            content: list[dict[str, str | int]] = await cls.svc.read_top_content(
-                int(page), user_id
+            projection = cls._feed_projection(request)
+            if projection is None:
+                return JSONResponse(
+                    InvalidProjectionValue.error(), status_code=cls.BAD_REQUEST
+                )
+            content, refreshed_at = await cls.svc.read_top_content(
+                int(page), user_id, *projection
+            )
+            headers: dict[str, str] = {}
+            if refreshed_at is not None:
+                age: timedelta = datetime.now(timezone.utc) - refreshed_at
+                headers["X-Ranking-Refreshed-At"] = refreshed_at.isoformat()
+                headers["X-Ranking-Age"] = str(max(int(age.total_seconds()), 0))
+            return validate_page(
+                request,
+                JSONResponse(content, status_code=cls.SUCCESS, headers=headers),
             )
-            return JSONResponse(content, status_code=cls.SUCCESS)
         except TypeError:
             return JSONResponse(InvalidPageValue.error(), status_code=cls.BAD_REQUEST)
-        except ConnectError:
-            return JSONResponse(
-                InternalCommunication.error(), status_code=cls.SERVER_ERROR
-            )
         except KeyError:
             return JSONResponse(
                 MissingFileOrUserId.error(), status_code=cls.BAD_REQUEST
@@ -166,3 +694,7 @@ class ContentEndpoint:
             return JSONResponse(
                 UserDoesNotExistError.error(), status_code=cls.NOT_FOUND
             )
+        except TransportError:
+            return JSONResponse(
+                UserServiceUnavailable.error(), status_code=cls.SERVICE_UNAVAILABLE
+            )
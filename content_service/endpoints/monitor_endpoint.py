@@ -0,0 +1,43 @@
+"""Handles monitoring endpoints for content service"""
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from content_service.endpoints.content_endpoint import ContentEndpoint
+from content_service.models import DATABASE
+from content_service.services.admission import ADMISSION
+from content_service.services.content_service import ContentService
+from content_service.services.internal_client import INTERNAL_CLIENT
+from content_service.services.metrics import METRICS
+from content_service.services.replicas import REPLICAS
+
+
+class MonitorEndpoint:
+    """class to expose runtime stats of content service"""
+
+    async def stats(self, _: Request) -> JSONResponse:
+        """Handles internal client, cache, ingest queue and ranking stats"""
+
+        return JSONResponse(
+            {
+                "admission": ADMISSION.stats(),
+                "dbPool": DATABASE.stats(),
+                "readReplicas": REPLICAS.stats(),
+                "internalClient": INTERNAL_CLIENT.stats(),
+                "userCache": ContentService.USER_CACHE.stats(),
+                "contentCache": ContentService.CONTENT_CACHE.stats(),
+                "singleFlight": {
+                    flight.name: flight.stats()
+                    for flight in (
+                        ContentService.USER_FLIGHT,
+                        ContentService.CONTENT_FLIGHT,
+                        ContentService.TOP_FLIGHT,
+                    )
+                },
+                "ingestJobs": ContentEndpoint.jobs.stats(),
+                "ranking": ContentEndpoint.ranking.stats(),
+            }
+        )
+
+    async def metrics(self, _: Request) -> Response:
+        """Handles prometheus scrape of request, db, upstream and ingest metrics"""
+
+        return Response(METRICS.render(), media_type=METRICS.CONTENT_TYPE)
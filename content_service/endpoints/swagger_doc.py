@@ -1,21 +1,58 @@
 """Handles swagger docs endpoint"""
+from pathlib import Path
 from starlette.requests import Request
-from starlette.responses import FileResponse, HTMLResponse
+from starlette.responses import Response
+from content_service.services.http_cache import (
+    REVALIDATE,
+    body_etag,
+    not_modified,
+    not_modified_response,
+)
+import content_service.settings as Config
+
+
+class StaticDocument:  # pylint: disable=too-few-public-methods
+    """static file read once, served from memory with a precomputed ETag"""
+
+    def __init__(
+        self, path: Path, media_type: str, headers: dict[str, str] | None = None
+    ) -> None:
+        self.body: bytes = path.read_bytes()
+        self.media_type: str = media_type
+        self.headers: dict[str, str] = {
+            **(headers or {}),
+            "ETag": body_etag(self.body),
+            "Cache-Control": REVALIDATE,
+        }
+
+    def response(self, request: Request) -> Response:
+        """document, or 304 when the client holds the current one"""
+
+        if not_modified(request, self.headers["ETag"]):
+            return not_modified_response(self.headers)
+        return Response(self.body, media_type=self.media_type, headers=self.headers)
 
 
 class SwaggerDoc:
     """class to handle swagger doc"""
 
-    async def swagger_ui(self, _: Request) -> HTMLResponse:
+    def __init__(self) -> None:
+        static: Path = Config.BASE_DIR / "static"
+        self.html: StaticDocument = StaticDocument(
+            static / "swagger_ui.html", "text/html"
+        )
+        self.spec: StaticDocument = StaticDocument(
+            static / "swagger.yaml",
+            "text/plain",
+            {"Content-Disposition": 'attachment; filename="openapi.yaml"'},
+        )
+
+    async def swagger_ui(self, request: Request) -> Response:
         """Handles html snippet for swagger doc"""
 
-        with open("./content_service/static/swagger_ui.html", encoding="utf-8") as file:
-            html_code: str = file.read()
-        return HTMLResponse(html_code)
+        return self.html.response(request)
 
-    async def get_spec(self, _: Request) -> FileResponse:
+    async def get_spec(self, request: Request) -> Response:
         """Handles yaml code for swagger doc"""
 
-        return FileResponse(
-            path="./content_service/static/swagger.yaml", filename="openapi.yaml"
-        )
+        return self.spec.response(request)
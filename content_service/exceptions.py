@@ -26,6 +26,19 @@ class MissingFileOrUserId:  # pylint: disable=too-few-public-methods
         }
 
 
+class InvalidCsvFile:  # pylint: disable=too-few-public-methods
+    """class for csv upload without required columns or not UTF-8"""
+
+    @staticmethod
+    def error() -> dict[str, Union[str, int]]:
+        """invalid csv file payload"""
+
+        return {
+            "code": 400,
+            "error": "Csv file must be UTF-8 with title, story, publishedDate columns",
+        }
+
+
 class InvalidPageValue:  # pylint: disable=too-few-public-methods
     """class for invalid page limit"""
 
@@ -36,6 +49,56 @@ class InvalidPageValue:  # pylint: disable=too-few-public-methods
         return {"code": 400, "error": "Page value is invalid"}
 
 
+class InvalidCursorValue:  # pylint: disable=too-few-public-methods
+    """class for invalid pagination cursor"""
+
+    @staticmethod
+    def error() -> dict[str, Union[str, int]]:
+        """invalid pagination cursor"""
+
+        return {"code": 400, "error": "Cursor value is invalid"}
+
+
+class InvalidBatchRequest:  # pylint: disable=too-few-public-methods
+    """class for invalid batch request body"""
+
+    @staticmethod
+    def error() -> dict[str, Union[str, int]]:
+        """invalid batch request payload"""
+
+        return {"code": 400, "error": "Batch request body or user id is invalid"}
+
+
+class InvalidExportParams:  # pylint: disable=too-few-public-methods
+    """class for invalid export format or date range"""
+
+    @staticmethod
+    def error() -> dict[str, Union[str, int]]:
+        """invalid export params payload"""
+
+        return {"code": 400, "error": "Export format or date range is invalid"}
+
+
+class InvalidSearchQuery:  # pylint: disable=too-few-public-methods
+    """class for missing search text"""
+
+    @staticmethod
+    def error() -> dict[str, Union[str, int]]:
+        """invalid search query payload"""
+
+        return {"code": 400, "error": "Search text is required in q query param"}
+
+
+class InvalidProjectionValue:  # pylint: disable=too-few-public-methods
+    """class for invalid fields or excerpt"""
+
+    @staticmethod
+    def error() -> dict[str, Union[str, int]]:
+        """invalid fields or excerpt"""
+
+        return {"code": 400, "error": "Fields or excerpt value is invalid"}
+
+
 class InternalCommunication:  # pylint: disable=too-few-public-methods
     """class for internal communication failure"""
 
@@ -54,3 +117,43 @@ class UserDoesNotExistError:  # pylint: disable=too-few-public-methods
         """user does not exist payload"""
 
         return {"code": 404, "error": "User not Found"}
+
+
+class UserServiceUnavailable:  # pylint: disable=too-few-public-methods
+    """class for user service being unreachable"""
+
+    @staticmethod
+    def error() -> dict[str, Union[str, int]]:
+        """user service unavailable payload"""
+
+        return {"code": 503, "error": "User service is unavailable"}
+
+
+class IngestQueueFull:  # pylint: disable=too-few-public-methods
+    """class for too many pending csv ingest jobs"""
+
+    @staticmethod
+    def error() -> dict[str, Union[str, int]]:
+        """ingest queue full payload"""
+
+        return {"code": 503, "error": "Too many csv uploads in progress, retry later"}
+
+
+class ServiceOverloaded:  # pylint: disable=too-few-public-methods
+    """class for requests shed by admission control"""
+
+    @staticmethod
+    def error() -> dict[str, Union[str, int]]:
+        """service overloaded payload"""
+
+        return {"code": 503, "error": "Service is overloaded, retry later"}
+
+
+class IngestJobDoesNotExistError:  # pylint: disable=too-few-public-methods
+    """class for unknown ingest job"""
+
+    @staticmethod
+    def error() -> dict[str, Union[str, int]]:
+        """ingest job does not exist payload"""
+
+        return {"code": 404, "error": "Ingest job not Found"}
@@ -1,19 +1,31 @@
 """Handles database connection and tables"""
-from sqlalchemy.engine.base import Engine
+import asyncio
+from typing import Final
+from sqlalchemy.engine.base import Connection
 from sqlalchemy import (
+    BigInteger,
     Column,
+    Computed,
+    Identity,
+    MetaData,
     String,
-    create_engine,
+    Table,
     DateTime,
+    Index,
+    Integer,
+    func,
+    inspect,
+    select,
+    text,
 )
-from sqlalchemy.orm import declarative_base
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Mapped, declarative_base, deferred, sessionmaker
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from content_service.services.metrics import TimedAsyncPool, instrument_engine
 import content_service.settings as Config
 
-# Database Configuration
-DB_ENGINE: Engine = create_engine(Config.DATABASE_URL)
 BASE = declarative_base()
-ASYNC_DB_ENGINE = create_async_engine(Config.ASYNC_DATABASE_URL)
 
 
 # Define SQLAlchemy Models
@@ -25,8 +37,186 @@ class Content(BASE):  # type: ignore # pylint: disable=too-few-public-methods
     story: Column = Column(String)
     publishedDate: Column = Column(DateTime)
     userID: Column = Column(String)
+    # set to clock_timestamp() by every write, see read_content_changes
+    updatedAt: Column = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),  # pylint: disable=not-callable
+    )
+    # full text search document, maintained by postgres on every write and
+    # never loaded with the entity
+    searchVector: Mapped[str] = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "to_tsvector('english', replace(coalesce(title, ''), '_', ' ') "
+                "|| ' ' || coalesce(story, ''))",
+                persisted=True,
+            ),
+        )
+    )
+
+    __table_args__ = (
+        # keyset pagination of latest content, see read_latest_content
+        Index("ix_Content_publishedDate_title", publishedDate.desc(), title.desc()),
+        Index("ix_Content_searchVector", "searchVector", postgresql_using="gin"),
+        Index("ix_Content_updatedAt_title", updatedAt, title),
+    )
+
+
+class ContentTombstone(BASE):  # type: ignore # pylint: disable=too-few-public-methods
+    """Deleted content titles kept for the change feed"""
+
+    __tablename__ = "ContentTombstone"
+    title: Column = Column(String, primary_key=True)
+    updatedAt: Column = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (Index("ix_ContentTombstone_updatedAt_title", updatedAt, title),)
+
+
+class ContentRanking(BASE):  # type: ignore # pylint: disable=too-few-public-methods
+    """Reads and likes per content mirrored from user interaction service"""
+
+    __tablename__ = "ContentRanking"
+    title: Column = Column(String, primary_key=True)
+    totalReads: Column = Column(Integer, nullable=False, default=0)
+    totalLikes: Column = Column(Integer, nullable=False, default=0)
+    refreshedAt: Column = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_ContentRanking_reads_likes_title",
+            totalReads.desc(),
+            totalLikes.desc(),
+            title,
+        ),
+        Index("ix_ContentRanking_refreshedAt", refreshedAt),
+    )
+
+
+# Per transaction staging table for csv ingest, kept out of BASE.metadata
+# so that create_all never creates it. `seq` keeps the upload order to let
+# the last duplicate title of a file win during the merge.
+STAGING_METADATA = MetaData()
+CONTENT_STAGING = Table(
+    "ContentStaging",
+    STAGING_METADATA,
+    Column("title", String),
+    Column("story", String),
+    Column("publishedDate", DateTime),
+    Column("userID", String),
+    Column("seq", BigInteger, Identity()),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+
+def create_schema(connection: Connection) -> None:
+    """Create missing tables, then add columns and indexes which were
+    added to the models after their table got created.
+    """
+
+    BASE.metadata.create_all(connection)
+    inspector = inspect(connection)
+    for table in BASE.metadata.sorted_tables:
+        existing: set[str] = {
+            column["name"] for column in inspector.get_columns(table.name)
+        }
+        for column in table.columns:
+            if column.name not in existing:
+                column_ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.execute(
+                    text(f'ALTER TABLE "{table.name}" ADD COLUMN {column_ddl}')
+                )
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def open_engine(url: str) -> AsyncEngine:
+    """async engine on an instrumented pool sized by the DB_POOL_* settings"""
+
+    engine: AsyncEngine = create_async_engine(
+        url,
+        poolclass=TimedAsyncPool,
+        pool_size=Config.DB_POOL_SIZE,
+        max_overflow=Config.DB_MAX_OVERFLOW,
+        pool_timeout=Config.DB_POOL_TIMEOUT,
+        pool_recycle=Config.DB_POOL_RECYCLE,
+        pool_pre_ping=Config.DB_POOL_PRE_PING,
+    )
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+class Database:
+    """async engine and session factory of a single worker
+    Nothing connects on import, the engine is created and its pool warmed
+    up by `connect` from the app lifespan. Sessions handed out before that
+    are unbound.
+    """
+
+    SCHEMA_LOCK_KEY: Final[int] = 0x736368656D61  # "schema"
+
+    def __init__(self) -> None:
+        self.engine: AsyncEngine | None = None
+        self.session = sessionmaker(class_=AsyncSession)  # type: ignore
+
+    async def connect(self) -> None:
+        """create engine, migrate schema and open DB_POOL_WARMUP connections"""
+
+        self.engine = open_engine(Config.ASYNC_DATABASE_URL)
+        self.session.configure(bind=self.engine)
+        async with self.engine.begin() as connection:
+            # workers booting together migrate one after another
+            await connection.execute(
+                select(func.pg_advisory_xact_lock(self.SCHEMA_LOCK_KEY))
+            )
+            await connection.run_sync(create_schema)
+        await self.warm_up(min(Config.DB_POOL_WARMUP, Config.DB_POOL_SIZE))
+
+    async def warm_up(self, connections: int) -> None:
+        """open connections concurrently and return them to the pool"""
+
+        if self.engine is None or connections <= 0:
+            return
+        opened = await asyncio.gather(
+            *(self.engine.connect() for _ in range(connections))
+        )
+        await asyncio.gather(*(connection.close() for connection in opened))
+
+    async def close(self) -> None:
+        """close every pooled connection"""
+
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = None
+
+    def stats(self) -> dict[str, int]:
+        """pool occupancy"""
+
+        if self.engine is None:
+            return {}
+        pool = self.engine.pool
+        return {
+            "size": pool.size(),  # type: ignore
+            "checkedIn": pool.checkedin(),  # type: ignore
+            "checkedOut": pool.checkedout(),  # type: ignore
+            "overflow": pool.overflow(),  # type: ignore
+        }
+
+
+DATABASE: Database = Database()
+
+
+async def reset_schema() -> None:
+    """Drop and recreate every table"""
+
+    engine: AsyncEngine = create_async_engine(Config.ASYNC_DATABASE_URL)
+    async with engine.begin() as connection:
+        await connection.run_sync(BASE.metadata.drop_all)
+        await connection.run_sync(BASE.metadata.create_all)
+    await engine.dispose()
 
 
 if __name__ == "__main__":
-    BASE.metadata.drop_all(DB_ENGINE)
-    BASE.metadata.create_all(DB_ENGINE)
+    asyncio.run(reset_schema())
@@ -1,45 +1,134 @@
 """Handles Content App Server"""
-from sqlalchemy import inspect
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 from starlette.applications import Starlette
 from starlette.routing import Route
 from starlette.middleware import Middleware
 from starlette.middleware.cors import CORSMiddleware
 from content_service.endpoints.content_endpoint import ContentEndpoint
+from content_service.endpoints.monitor_endpoint import MonitorEndpoint
 from content_service.endpoints.swagger_doc import SwaggerDoc
-from content_service.models import BASE, DB_ENGINE
+from content_service.models import DATABASE
+from content_service.services.admission import ADMISSION
+from content_service.services.csv_ingest import PARSE_POOL
+from content_service.services.http_cache import CompressionMiddleware
+from content_service.services.internal_client import INTERNAL_CLIENT
+from content_service.services.replicas import REPLICAS
+from content_service.services.metrics import MetricsMiddleware
+import content_service.settings as Config
 
 content_endpoint: ContentEndpoint = ContentEndpoint()
+monitor_endpoint: MonitorEndpoint = MonitorEndpoint()
 swagger_doc: SwaggerDoc = SwaggerDoc()
 
 routes: list[Route] = [
-    Route("/content", content_endpoint.create_content, methods=["POST"]),
-    Route("/content/new", content_endpoint.fetch_latest_content, methods=["GET"]),
-    Route("/content/top", content_endpoint.fetch_top_content, methods=["GET"]),
-    Route("/content/{title}", content_endpoint.update_content, methods=["PATCH"]),
-    Route("/content/{title}", content_endpoint.delete_content, methods=["DELETE"]),
-    Route("/content/{title}", content_endpoint.fetch_content, methods=["GET"]),
+    Route(
+        "/content",
+        ADMISSION.limit("ingest", content_endpoint.create_content, low_priority=True),
+        methods=["POST"],
+    ),
+    Route(
+        "/content/batch",
+        ADMISSION.limit("read", content_endpoint.fetch_contents),
+        methods=["POST"],
+    ),
+    Route(
+        "/content/batch",
+        ADMISSION.limit("write", content_endpoint.update_contents),
+        methods=["PATCH"],
+    ),
+    Route(
+        "/content/batch",
+        ADMISSION.limit("write", content_endpoint.delete_contents),
+        methods=["DELETE"],
+    ),
+    Route(
+        "/content/export",
+        ADMISSION.limit("export", content_endpoint.export_content),
+        methods=["GET"],
+    ),
+    Route(
+        "/content/search",
+        ADMISSION.limit("feed", content_endpoint.search_content),
+        methods=["GET"],
+    ),
+    Route(
+        "/content/changes",
+        ADMISSION.limit("feed", content_endpoint.fetch_content_changes),
+        methods=["GET"],
+    ),
+    Route(
+        "/content/new",
+        ADMISSION.limit("feed", content_endpoint.fetch_latest_content),
+        methods=["GET"],
+    ),
+    Route(
+        "/content/top",
+        ADMISSION.limit("feed", content_endpoint.fetch_top_content),
+        methods=["GET"],
+    ),
+    Route("/content/jobs/{job_id}", content_endpoint.fetch_ingest_job, methods=["GET"]),
+    Route(
+        "/content/{title}",
+        ADMISSION.limit("write", content_endpoint.update_content),
+        methods=["PATCH"],
+    ),
+    Route(
+        "/content/{title}",
+        ADMISSION.limit("write", content_endpoint.delete_content),
+        methods=["DELETE"],
+    ),
+    Route(
+        "/content/{title}",
+        ADMISSION.limit("read", content_endpoint.fetch_content),
+        methods=["GET"],
+    ),
     Route("/content-service/docs", swagger_doc.swagger_ui, methods=["GET"]),
     Route("/content-service/spec", swagger_doc.get_spec, methods=["GET"]),
+    Route("/content-service/stats", monitor_endpoint.stats, methods=["GET"]),
+    Route("/metrics", monitor_endpoint.metrics, methods=["GET"]),
 ]
 
 
-def on_startup():
-    """Check if table exist or not and create table"""
-    inspector = inspect(DB_ENGINE)
-    if not inspector.has_table("Content"):
-        BASE.metadata.create_all(DB_ENGINE)
+@asynccontextmanager
+async def lifespan(_: Starlette) -> AsyncIterator[None]:
+    """Connect and migrate database, warm up its pool, start ingest workers
+    and ranking sync before the worker reports ready, release shared
+    clients on shutdown"""
+    await DATABASE.connect()
+    await REPLICAS.start()
+    await content_endpoint.jobs.start()
+    await content_endpoint.ranking.start()
+    yield
+    await content_endpoint.ranking.close()
+    await content_endpoint.jobs.close()
+    PARSE_POOL.close()
+    await INTERNAL_CLIENT.close()
+    await REPLICAS.close()
+    await DATABASE.close()
 
 
 middleware = [
+    Middleware(MetricsMiddleware, routes=routes),
+    Middleware(
+        CompressionMiddleware,
+        minimum_size=Config.GZIP_MINIMUM_SIZE,
+        compresslevel=Config.GZIP_COMPRESS_LEVEL,
+    ),
     Middleware(
         CORSMiddleware,
         allow_origins=["*"],
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[
+            "X-Next-Cursor",
+            "X-Ranking-Refreshed-At",
+            "X-Ranking-Age",
+            "Retry-After",
+            "ETag",
+        ],
     ),
 ]
 
-app: Starlette = Starlette(routes=routes, middleware=middleware)
-
-app.add_event_handler("startup", on_startup)
+app: Starlette = Starlette(routes=routes, middleware=middleware, lifespan=lifespan)
@@ -0,0 +1,192 @@
+"""Handles admission control and load shedding of routes"""
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Final
+from starlette.responses import JSONResponse
+from starlette.routing import request_response
+from starlette.types import ASGIApp, Receive, Scope, Send
+from content_service.exceptions import ServiceOverloaded
+from content_service.services.metrics import ADMISSION_IN_FLIGHT, SHED_REQUESTS
+import content_service.settings as Config
+
+
+@dataclass
+class AdmissionCounts:
+    """requests admitted and shed by reason"""
+
+    admitted: int = 0
+    shed: dict[str, int] = field(
+        default_factory=lambda: {"queueFull": 0, "timeout": 0, "priority": 0}
+    )
+
+
+class ConcurrencyLimiter:
+    """concurrency limit with a bounded FIFO wait queue for one route class
+    A finished request hands its slot straight to the oldest waiter, a
+    request is shed when the queue is full or it waited longer than
+    `queue_timeout` seconds.
+    """
+
+    def __init__(
+        self, name: str, limit: int, max_queue: int, queue_timeout: float
+    ) -> None:
+        self.name: str = name
+        self.limit: int = limit
+        self.max_queue: int = max_queue
+        self.queue_timeout: float = queue_timeout
+        self.active: int = 0
+        self.counts: AdmissionCounts = AdmissionCounts()
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> bool:
+        """wait for a slot, False when the request must be shed"""
+
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            ADMISSION_IN_FLIGHT.labels(self.name).set(self.active)
+            return self._admit()
+        if len(self._waiters) >= self.max_queue:
+            return self.reject("queueFull")
+        waiter: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+            return self._admit()
+        except asyncio.TimeoutError:
+            return self.reject("timeout")
+        except asyncio.CancelledError:
+            # the slot may have been handed over right before cancellation
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self) -> None:
+        """free a slot or hand it to the oldest waiter"""
+
+        while self._waiters:
+            waiter: asyncio.Future = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+        ADMISSION_IN_FLIGHT.labels(self.name).set(self.active)
+
+    def reject(self, reason: str) -> bool:
+        """count a shed request"""
+
+        self.counts.shed[reason] += 1
+        SHED_REQUESTS.labels(self.name, reason).inc()
+        return False
+
+    def _admit(self) -> bool:
+        """count an admitted request"""
+
+        self.counts.admitted += 1
+        return True
+
+    def stats(self) -> dict[str, int | dict[str, int]]:
+        """occupancy and shed counts"""
+
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "maxQueue": self.max_queue,
+            "admitted": self.counts.admitted,
+            "shed": dict(self.counts.shed),
+        }
+
+
+class AdmissionGate:  # pylint: disable=too-few-public-methods
+    """ASGI app admitting requests to a single endpoint through a limiter
+    Used as a Route endpoint, the slot is held until the response, a
+    streamed one included, has been sent.
+    """
+
+    SERVICE_UNAVAILABLE: Final[int] = 503
+
+    def __init__(
+        self,
+        controller: "AdmissionController",
+        limiter: ConcurrencyLimiter,
+        endpoint: Callable,
+        low_priority: bool,
+    ) -> None:
+        self.controller: AdmissionController = controller
+        self.limiter: ConcurrencyLimiter = limiter
+        self.low_priority: bool = low_priority
+        self.app: ASGIApp = request_response(endpoint)
+        self.__name__: str = endpoint.__name__
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.low_priority and self.controller.busy(self.limiter):
+            self.limiter.reject("priority")
+        elif await self.limiter.acquire():
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self.limiter.release()
+            return
+        response: JSONResponse = JSONResponse(
+            ServiceOverloaded.error(),
+            status_code=self.SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(Config.ADMISSION_RETRY_AFTER)},
+        )
+        await response(scope, receive, send)
+
+
+class AdmissionController:
+    """per route class limiters of a worker
+    Low priority routes, csv ingest, are shed outright while requests of
+    other classes hold ADMISSION_LOW_PRIORITY_THRESHOLD slots or more, so
+    uploads never compete with reads for connections under load.
+    """
+
+    def __init__(self) -> None:
+        self.limiters: dict[str, ConcurrencyLimiter] = {}
+
+    def limiter(self, name: str) -> ConcurrencyLimiter:
+        """limiter of route class configured by ADMISSION_<NAME>_* settings"""
+
+        if name not in self.limiters:
+            prefix: str = f"ADMISSION_{name.upper()}"
+            self.limiters[name] = ConcurrencyLimiter(
+                name,
+                getattr(Config, f"{prefix}_CONCURRENCY"),
+                getattr(Config, f"{prefix}_QUEUE"),
+                Config.ADMISSION_QUEUE_TIMEOUT,
+            )
+        return self.limiters[name]
+
+    def limit(
+        self, name: str, endpoint: Callable, low_priority: bool = False
+    ) -> AdmissionGate:
+        """wrap endpoint to be admitted by the limiter of route class name"""
+
+        return AdmissionGate(self, self.limiter(name), endpoint, low_priority)
+
+    def busy(self, excluded: ConcurrencyLimiter) -> bool:
+        """whether requests outside of excluded hold enough slots to shed
+        low priority requests
+        """
+
+        return (
+            sum(
+                limiter.active
+                for limiter in self.limiters.values()
+                if limiter is not excluded
+            )
+            >= Config.ADMISSION_LOW_PRIORITY_THRESHOLD
+        )
+
+    def stats(self) -> dict[str, dict]:
+        """stats of every limiter"""
+
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
+
+
+ADMISSION: AdmissionController = AdmissionController()
@@ -0,0 +1,24 @@
+"""Handles background loops of long lived services"""
+import asyncio
+from typing import Awaitable, Callable
+
+
+class BackgroundTask:
+    """a coroutine function run as one background task until stopped"""
+
+    def __init__(self, run: Callable[[], Awaitable[None]]) -> None:
+        self.run: Callable[[], Awaitable[None]] = run
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """spawn the task"""
+
+        self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self) -> None:
+        """cancel the task and wait until it finished"""
+
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,150 @@
+"""Handles in-process caches used by content services"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable
+
+
+@dataclass
+class CacheCounters:
+    """lookups and evictions of a cache"""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class WriteGenerations:
+    """write generation of the last `max_size` keys written, older keys
+    share the generation of the last one forgotten
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size: int = max_size
+        self._keys: OrderedDict[Hashable, int] = OrderedDict()
+        self._writes: int = 0
+        self._floor: int = 0
+
+    def get(self, key: Hashable) -> int:
+        """current generation of key"""
+
+        return self._keys.get(key, self._floor)
+
+    def bump(self, key: Hashable) -> None:
+        """move key to a new generation"""
+
+        self._writes += 1
+        self._keys[key] = self._writes
+        self._keys.move_to_end(key)
+        if len(self._keys) > self.max_size:
+            self._floor = self._keys.popitem(last=False)[1]
+
+    def bump_all(self) -> None:
+        """move every key to a new generation"""
+
+        self._writes += 1
+        self._keys.clear()
+        self._floor = self._writes
+
+
+class TTLCache:
+    """bounded LRU cache whose entries expire after a per-entry ttl
+    Bounded by entry count and, when `max_bytes` is set, by the total
+    size reported for each entry on `set`. Writes bump the generation of
+    their key, see `written`, so fills read before a write can be dropped.
+    """
+
+    def __init__(self, max_size: int, max_bytes: int = 0) -> None:
+        self.max_size: int = max_size
+        self.max_bytes: int = max_bytes
+        self.bytes: int = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any, int]] = OrderedDict()
+        self._generations: WriteGenerations = WriteGenerations(max_size)
+        self.counters: CacheCounters = CacheCounters()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """return cached value for key or default when missing or expired"""
+
+        entry: tuple[float, Any, int] | None = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                self.invalidate(key)
+            self.counters.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.counters.hits += 1
+        return entry[1]
+
+    def set(  # pylint: disable=too-many-arguments
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: float,
+        size: int = 0,
+        generation: int | None = None,
+    ) -> None:
+        """store value for ttl seconds, evicting least recently used entries
+        A value read at `generation` is dropped when key was written since.
+        """
+
+        if self.max_size <= 0 or ttl <= 0:
+            return
+        if generation is not None and generation != self.generation(key):
+            return
+        if self.max_bytes and size > self.max_bytes:
+            self.invalidate(key)
+            return
+        self.invalidate(key)
+        self._data[key] = (time.monotonic() + ttl, value, size)
+        self.bytes += size
+        while len(self._data) > self.max_size or (
+            self.max_bytes and self.bytes > self.max_bytes
+        ):
+            self.bytes -= self._data.popitem(last=False)[1][2]
+            self.counters.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """drop key from cache if present"""
+
+        entry: tuple[float, Any, int] | None = self._data.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def generation(self, key: Hashable) -> int:
+        """write generation of key, taken before reading a value to cache"""
+
+        return self._generations.get(key)
+
+    def written(self, key: Hashable) -> None:
+        """drop key after a write, bumping its generation"""
+
+        self.invalidate(key)
+        if self.max_size <= 0:
+            return
+        self._generations.bump(key)
+
+    def clear(self) -> None:
+        """drop every cached entry, bumping the generation of every key"""
+
+        self._data.clear()
+        self.bytes = 0
+        self._generations.bump_all()
+
+    def stats(self) -> dict[str, int | float]:
+        """hit/miss counters and current occupancy"""
+
+        counters: CacheCounters = self.counters
+        lookups: int = counters.hits + counters.misses
+        return {
+            "size": len(self._data),
+            "maxSize": self.max_size,
+            "bytes": self.bytes,
+            "maxBytes": self.max_bytes,
+            "hits": counters.hits,
+            "misses": counters.misses,
+            "evictions": counters.evictions,
+            "hitRatio": counters.hits / lookups if lookups else 0.0,
+        }
@@ -1,44 +1,197 @@
 """Handles content services"""
-import csv
-from typing import Final
-from httpx import AsyncClient, Response
-from io import StringIO
-from dateutil import parser  # type: ignore
-from sqlalchemy import update, delete, select
-from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy.ext.asyncio import AsyncEngine
+import sys
+import time
+from contextlib import aclosing
+from datetime import datetime
+from typing import (
+    IO,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Final,
+    Hashable,
+    Iterable,
+    Sequence,
+)
+from httpx import Response
+from sqlalchemy import (
+    Result,
+    Row,
+    String,
+    and_,
+    any_,
+    or_,
+    bindparam,
+    column,
+    update,
+    delete,
+    select,
+    tuple_,
+    func,
+    literal,
+    null,
+    text,
+    union_all,
+    values,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import AsyncSession
-from content_service.models import Content
+from content_service.models import (
+    CONTENT_STAGING,
+    Content,
+    ContentRanking,
+    ContentTombstone,
+)
+from content_service.services.cache import TTLCache
+from content_service.services.csv_ingest import (
+    STAGING_COLUMNS,
+    IngestStats,
+    parse_upload,
+)
+from content_service.services.cursor import encode_cursor
+from content_service.services.internal_client import InternalClient
+from content_service.services.replicas import Replica, ReplicaSet
+from content_service.services.single_flight import SingleFlight
 import content_service.settings as Config
 
 
+class ContentNotFound(Exception):
+    """raised when no content matches the requested title"""
+
+
 class ContentService:
-    """content service class"""
+    """content service class, reads may be served by replicas"""
 
     DATA_PER_PAGE: Final[int] = 100
     SUCCESS: Final[int] = 200
-    INTERNAL_HEADERS: dict[str, str] = {
-        "x-internal": "groot",
-    }
+    NOT_FOUND: Final[int] = 404
+    CONTENT_FIELDS: Final[tuple[str, ...]] = (
+        "title",
+        "story",
+        "publishedDate",
+        "userID",
+    )
+    USER_CACHE: TTLCache = TTLCache(Config.USER_CACHE_MAX_SIZE)
+    CONTENT_CACHE: TTLCache = TTLCache(
+        Config.CONTENT_CACHE_MAX_SIZE, Config.CONTENT_CACHE_MAX_BYTES
+    )
+    # start of the oldest transaction in progress writing contents or
+    # tombstones, its changes may commit behind those already served
+    CHANGES_HORIZON = text(
+        "SELECT least(min(activity.xact_start), clock_timestamp()) "
+        "- make_interval(secs => :settle) "
+        "FROM pg_locks AS held JOIN pg_stat_activity AS activity USING (pid) "
+        "WHERE held.locktype = 'relation' AND held.mode = 'RowExclusiveLock' "
+        "AND held.database = (SELECT oid FROM pg_database "
+        "WHERE datname = current_database()) "
+        "AND held.relation IN ('\"Content\"'::regclass, "
+        "'\"ContentTombstone\"'::regclass)"
+    )
+    # concurrent cache misses for the same key share a single lookup
+    USER_FLIGHT: SingleFlight = SingleFlight("user")
+    CONTENT_FLIGHT: SingleFlight = SingleFlight("content")
+    TOP_FLIGHT: SingleFlight = SingleFlight("top")
+
+    def __init__(
+        self, async_session: sessionmaker, client: InternalClient, replicas: ReplicaSet
+    ) -> None:
+        self.async_session: sessionmaker = async_session
+        self.client: InternalClient = client
+        self.replicas: ReplicaSet = replicas
+
+    @staticmethod
+    def normalize_title(title: str) -> str:
+        """title -> replace space to underscore and all letters to lower"""
+
+        return title.lower().replace(" ", "_")
+
+    async def user_exists(self, user_id: str) -> bool:
+        """check if user exists in user service repo
+        answers are cached and concurrent checks share one request
+        """
+
+        exists: bool | None = self.USER_CACHE.get(user_id)
+        if exists is not None:
+            return exists
+        return await self.USER_FLIGHT.do(
+            user_id, lambda: self._fetch_user_exists(user_id)
+        )
+
+    async def _fetch_user_exists(self, user_id: str) -> bool:
+        """ask user service whether user exists and cache the answer"""
 
-    def __init__(self, db_engine: AsyncEngine) -> None:
-        self.async_session = sessionmaker(
-            db_engine, class_=AsyncSession
-        )  # type: ignore
+        user: Response = await self.client.get(
+            Config.USER_SERVICE_HOST, f"/user/{user_id}"
+        )
+        if user.status_code == self.SUCCESS:
+            self.USER_CACHE.set(user_id, True, Config.USER_CACHE_TTL)
+        elif user.status_code == self.NOT_FOUND:
+            self.USER_CACHE.set(user_id, False, Config.USER_CACHE_NEGATIVE_TTL)
+        return user.status_code == self.SUCCESS
+
+    def _title_fences(self, user_id: str, titles: Iterable[str]) -> list[Hashable]:
+        """fence keys of reading titles, which end up in CONTENT_CACHE"""
+
+        return [
+            self.replicas.user(user_id),
+            self.replicas.ALL_TITLES,
+            *(self.replicas.title(title) for title in titles),
+        ]
+
+    async def _read(self, query, fences: Iterable[Hashable]) -> Result:
+        """run read only query on a replica serving fences, or the primary"""
+
+        replica: Replica | None = self.replicas.pick(fences)
+        if replica is not None:
+            try:
+                async with replica.session() as db_session:  # type: ignore
+                    return await db_session.execute(query)
+            except (DBAPIError, OSError) as error:
+                self.replicas.failed(replica, error)
+        async with self.async_session() as db_session:  # type: ignore
+            return await db_session.execute(query)
 
     @classmethod
-    async def user_exists(cls, user_id: str) -> bool:
-        """check if user exists in user service repo"""
+    def _cache_content(
+        cls, content: dict[str, str | datetime], generation: int | None = None
+    ) -> None:
+        """store content read at `generation` in cache"""
 
-        async with AsyncClient() as client:
-            url: str = f"http://{Config.USER_SERVICE_HOST}/user/{user_id}"
-            user: Response = await client.get(
-                url, headers=cls.INTERNAL_HEADERS, timeout=10.0
-            )
-            return user.status_code == cls.SUCCESS
+        size: int = sys.getsizeof(content["title"]) + sys.getsizeof(content["story"])
+        cls.CONTENT_CACHE.set(
+            content["title"],
+            content,
+            Config.CONTENT_CACHE_TTL,
+            size,
+            generation,
+        )
 
-    async def create_content_service(self, csv_obj: StringIO, user_id: str) -> int:
+    @staticmethod
+    def _delete_returning(condition):
+        """delete contents matching condition and tombstone them, returning
+        the deleted titles
+        """
+
+        deleted = (
+            delete(Content)
+            .where(condition)
+            .returning(Content.title)
+            .execution_options(synchronize_session=False)
+            .cte("deleted")
+        )
+        query = insert(ContentTombstone).from_select(
+            ("title", "updatedAt"), select(deleted.c.title, func.clock_timestamp())
+        )
+        return query.on_conflict_do_update(
+            index_elements=["title"], set_={"updatedAt": query.excluded.updatedAt}
+        ).returning(ContentTombstone.title)
+
+    async def create_content_service(
+        self, csv_file: IO[bytes], user_id: str, stats: IngestStats | None = None
+    ) -> IngestStats:
         """Create content entity and a unique id for current content
         and create a record in Content table.
         title -> replace space to underscore and all letters to lower
@@ -46,173 +199,634 @@ class ContentService:
 
         if not await self.user_exists(user_id):
             raise ValueError
+        stats = stats or IngestStats()
+        stats.started = time.perf_counter()
+        written_titles: list[str] = []
         async with self.async_session() as db_session:  # type: ignore
             try:
-                csv_datas: list = [
-                    {
-                        "title": row["title"].lower().replace(" ", "_"),
-                        "story": row["story"],
-                        "publishedDate": parser.parse(row["publishedDate"]),
-                        "userID": user_id,
-                    }
-                    for row in csv.DictReader(csv_obj)
-                ]
-                query = insert(Content).values(csv_datas)
+                connection = await db_session.connection()
+                await connection.run_sync(CONTENT_STAGING.create)
+                raw_connection = await connection.get_raw_connection()
+                async with aclosing(parse_upload(csv_file, user_id, stats)) as batches:
+                    async for batch in batches:
+                        await raw_connection.driver_connection.copy_records_to_table(
+                            CONTENT_STAGING.name,
+                            records=batch,
+                            columns=STAGING_COLUMNS,
+                        )
+                        stats.rows_staged += len(batch)
+                        if len(written_titles) <= self.CONTENT_CACHE.max_size:
+                            written_titles.extend(record[0] for record in batch)
+                latest = (
+                    select(
+                        *(CONTENT_STAGING.c[column] for column in STAGING_COLUMNS),
+                        func.clock_timestamp(),
+                    )
+                    .distinct(CONTENT_STAGING.c.title)
+                    .order_by(CONTENT_STAGING.c.title, CONTENT_STAGING.c.seq.desc())
+                )
+                query = insert(Content).from_select(
+                    (*STAGING_COLUMNS, "updatedAt"), latest
+                )
                 query = query.on_conflict_do_update(
                     index_elements=["title"],
-                    set_={"story": query.excluded.story},
+                    set_={
+                        "story": query.excluded.story,
+                        "updatedAt": query.excluded.updatedAt,
+                    },
+                    where=Content.story.is_distinct_from(query.excluded.story),
+                )
+                stats.rows_written = (await db_session.execute(query)).rowcount
+                await db_session.execute(
+                    delete(ContentTombstone).where(
+                        ContentTombstone.title.in_(select(CONTENT_STAGING.c.title))
+                    )
                 )
-                await db_session.execute(query)
                 await db_session.commit()
-                return len(csv_datas)
+                # titles stop being collected once there are too many to cache
+                listed: bool = len(written_titles) <= self.CONTENT_CACHE.max_size
+                await self.replicas.fence(
+                    db_session,
+                    self.replicas.write_fences(
+                        user_id, written_titles if listed else None
+                    ),
+                )
+                if not listed:
+                    self.CONTENT_CACHE.clear()
+                    self.CONTENT_FLIGHT.clear()
+                for written_title in written_titles:
+                    self.CONTENT_CACHE.written(written_title)
+                    self.CONTENT_FLIGHT.forget(written_title)
+                stats.finished = time.perf_counter()
+                return stats
             except Exception as error:
-                db_session.rollback()
+                await db_session.rollback()
                 raise error
 
     async def update_content_service(
         self, title: str, story: str, user_id: str
-    ) -> dict[str, str]:
+    ) -> dict[str, str | datetime]:
         """content service to update content details"""
 
         if not await self.user_exists(user_id):
             raise ValueError
+        generation: int = self.CONTENT_CACHE.generation(title)
         async with self.async_session() as db_session:  # type: ignore
             try:
                 query = (
-                    update(Content).where(Content.title == title).values(story=story)
+                    update(Content)
+                    .where(Content.title == title)
+                    .values(story=story, updatedAt=func.clock_timestamp())
+                    .returning(Content.title, Content.story, Content.updatedAt)
+                    .execution_options(synchronize_session=False)
                 )
-                await db_session.execute(query)
+                updated = (await db_session.execute(query)).one_or_none()
+                if updated is None:
+                    raise ContentNotFound(title)
                 await db_session.commit()
-                return await self.read_content_service(title, user_id)
+                await self.replicas.fence(
+                    db_session,
+                    [self.replicas.user(user_id), self.replicas.title(title)],
+                )
+                content: dict[str, str | datetime] = {
+                    "title": updated.title,
+                    "story": updated.story,
+                    "updatedAt": updated.updatedAt,
+                }
+                # a later write of the title may have committed meanwhile
+                stale: bool = self.CONTENT_CACHE.generation(title) != generation
+                self.CONTENT_CACHE.written(title)
+                if not stale:
+                    self._cache_content(content)
+                self.CONTENT_FLIGHT.forget(title)
+                return content
             except Exception as error:
                 await db_session.rollback()
                 raise error
 
-    async def read_content_service(self, title: str, user_id: str) -> dict[str, str]:
+    async def read_content_service(
+        self, title: str, user_id: str
+    ) -> dict[str, str | datetime]:
         """Read content based on the content title"""
 
         if not await self.user_exists(user_id):
             raise ValueError
-        async with self.async_session() as db_session:  # type: ignore
-            content: Content = await db_session.get(Content, title)
-            return {
-                "title": content.title,  # type: ignore
-                "story": content.story,  # type: ignore
-            }
+        content: dict[str, str | datetime] | None = self.CONTENT_CACHE.get(title)
+        if content is None:
+            content = await self.CONTENT_FLIGHT.do(
+                title, lambda: self._load_content(title, user_id)
+            )
+        return content
+
+    async def _load_content(
+        self, title: str, user_id: str
+    ) -> dict[str, str | datetime]:
+        """read content and its version by title and cache it"""
+
+        generation: int = self.CONTENT_CACHE.generation(title)
+        query = select(Content.title, Content.story, Content.updatedAt).where(
+            Content.title == title
+        )
+        row = (
+            await self._read(query, self._title_fences(user_id, [title]))
+        ).one_or_none()
+        if row is None:
+            raise ContentNotFound(title)
+        content: dict[str, str | datetime] = {
+            "title": row.title,
+            "story": row.story,
+            "updatedAt": row.updatedAt,
+        }
+        self._cache_content(content, generation)
+        return content
+
+    async def read_contents_service(
+        self, titles: list[str], user_id: str, fields: list[str]
+    ) -> tuple[list[dict[str, str]], list[str]]:
+        """Read only `fields` of many contents based on content titles
+        Returns found contents in request order and the missing titles.
+        """
+
+        if not await self.user_exists(user_id):
+            raise ValueError
+        titles = list(dict.fromkeys(self.normalize_title(title) for title in titles))
+        fields = ["title"] + [field for field in fields if field != "title"]
+        found: dict[str, dict[str, str]] = self._cached_contents(titles, fields)
+        remaining: list[str] = [title for title in titles if title not in found]
+        if remaining:
+            found.update(await self._fetch_contents(remaining, user_id, fields))
+        return (
+            [found[title] for title in titles if title in found],
+            [title for title in titles if title not in found],
+        )
+
+    def _cached_contents(
+        self, titles: list[str], fields: list[str]
+    ) -> dict[str, dict[str, str]]:
+        """`fields` of titles found in CONTENT_CACHE, which holds title and story"""
+
+        found: dict[str, dict[str, str]] = {}
+        if not set(fields) <= {"title", "story"}:
+            return found
+        for title in titles:
+            cached: dict[str, str] | None = self.CONTENT_CACHE.get(title)
+            if cached is not None:
+                found[title] = {field: cached[field] for field in fields}
+        return found
+
+    async def _fetch_contents(
+        self, titles: list[str], user_id: str, fields: list[str]
+    ) -> dict[str, dict[str, str]]:
+        """`fields` of titles read in one query, title and story reads are
+        cached
+        """
+
+        # cached contents carry the version single reads are tagged with
+        cache_rows: bool = set(fields) == {"title", "story"}
+        columns: list = [getattr(Content, field) for field in fields]
+        if cache_rows:
+            columns.append(Content.updatedAt)
+        generations: dict[str, int] = {
+            title: self.CONTENT_CACHE.generation(title) for title in titles
+        }
+        query = select(*columns).where(
+            Content.title
+            == any_(bindparam("titles", titles, ARRAY(Content.title.type)))
+        )
+        found: dict[str, dict[str, str]] = {}
+        result = await self._read(query, self._title_fences(user_id, titles))
+        for row in result.mappings():
+            content: dict[str, str] = dict(row)
+            if "publishedDate" in content:
+                content["publishedDate"] = str(content["publishedDate"])
+            if cache_rows:
+                self._cache_content(
+                    content, generations[content["title"]]  # type: ignore
+                )
+            found[content["title"]] = {field: content[field] for field in fields}
+        return found
 
     async def delete_content_service(self, title: str, user_id: str) -> None:
         """Delete content record based on content title"""
 
         if not await self.user_exists(user_id):
             raise ValueError
-        try:
-            async with self.async_session() as db_session:  # type: ignore
-                _: dict[str, str] = await self.read_content_service(title, user_id)
-                query = delete(Content).where(Content.title == title)
-                await db_session.execute(query)
+        async with self.async_session() as db_session:  # type: ignore
+            try:
+                query = self._delete_returning(Content.title == title)
+                if (await db_session.execute(query)).one_or_none() is None:
+                    raise ContentNotFound(title)
                 await db_session.commit()
-        except Exception as error:
-            await db_session.rollback()
-            raise error
+                await self.replicas.fence(
+                    db_session,
+                    [self.replicas.user(user_id), self.replicas.title(title)],
+                )
+                self.CONTENT_CACHE.written(title)
+                self.CONTENT_FLIGHT.forget(title)
+            except Exception as error:
+                await db_session.rollback()
+                raise error
 
-    async def read_latest_content(
-        self, page: int, user_id: str
-    ) -> list[dict[str, str]]:
-        """Fetch the latest content record sorted by date
-        NOTE: 1 page contains 100 content data.
+    async def _apply_in_chunks(
+        self,
+        titles: list[str],
+        user_id: str,
+        apply: Callable[[AsyncSession, list[str]], Awaitable[list[str]]],
+    ) -> tuple[list[str], list[str], list[str]]:
+        """Run `apply` on BATCH_MUTATION_CHUNK titles per transaction
+        Returns changed, missing and failed titles in request order.
+        """
+
+        changed: set[str] = set()
+        failed: set[str] = set()
+        # requests with too many titles to fence one by one fence them all
+        listed: bool = len(titles) <= Config.REPLICA_FENCE_MAX_TITLES
+        for start in range(0, len(titles), Config.BATCH_MUTATION_CHUNK):
+            chunk: list[str] = titles[start : start + Config.BATCH_MUTATION_CHUNK]
+            async with self.async_session() as db_session:  # type: ignore
+                try:
+                    done: list[str] = await apply(db_session, chunk)
+                    await db_session.commit()
+                except (DBAPIError, OSError):
+                    await db_session.rollback()
+                    failed.update(chunk)
+                    continue
+                await self.replicas.fence(
+                    db_session,
+                    self.replicas.write_fences(user_id, done if listed else None),
+                )
+            for title in done:
+                self.CONTENT_CACHE.written(title)
+                self.CONTENT_FLIGHT.forget(title)
+            changed.update(done)
+        return (
+            [title for title in titles if title in changed],
+            [title for title in titles if title not in changed | failed],
+            [title for title in titles if title in failed],
+        )
+
+    @staticmethod
+    async def _update_chunk(
+        db_session: AsyncSession, chunk: list[str], stories: dict[str, str]
+    ) -> list[str]:
+        """set stories of a chunk of titles, returns the titles updated"""
+
+        rows = values(
+            column("title", String), column("story", String), name="updates"
+        ).data([(title, stories[title]) for title in chunk])
+        query = (
+            update(Content)
+            .where(Content.title == rows.c.title)
+            .values(story=rows.c.story, updatedAt=func.clock_timestamp())
+            .returning(Content.title)
+            .execution_options(synchronize_session=False)
+        )
+        return list((await db_session.execute(query)).scalars())
+
+    async def update_contents_service(
+        self, updates: list[tuple[str, str]], user_id: str
+    ) -> tuple[list[str], list[str], list[str]]:
+        """Update stories of many contents based on content titles
+        Returns updated, missing and failed titles.
         """
 
         if not await self.user_exists(user_id):
             raise ValueError
-        async with self.async_session() as db_session:  # type: ignore
-            query = (
-                select(Content)
-                .order_by(Content.publishedDate.desc())
-                .offset((page - 1) * self.DATA_PER_PAGE)
-                .limit(page * self.DATA_PER_PAGE)
+        stories: dict[str, str] = {
+            self.normalize_title(title): story for title, story in updates
+        }
+        return await self._apply_in_chunks(
+            list(stories),
+            user_id,
+            lambda db_session, chunk: self._update_chunk(db_session, chunk, stories),
+        )
+
+    async def _delete_chunk(
+        self, db_session: AsyncSession, chunk: list[str]
+    ) -> list[str]:
+        """delete a chunk of titles, returns the titles deleted"""
+
+        chunk_titles = bindparam("titles", chunk, ARRAY(Content.title.type))
+        query = self._delete_returning(Content.title == any_(chunk_titles))
+        return list((await db_session.execute(query)).scalars())
+
+    async def delete_contents_service(
+        self, titles: list[str], user_id: str
+    ) -> tuple[list[str], list[str], list[str]]:
+        """Delete many content records based on content titles
+        Returns deleted, missing and failed titles.
+        """
+
+        if not await self.user_exists(user_id):
+            raise ValueError
+        return await self._apply_in_chunks(
+            list(dict.fromkeys(self.normalize_title(title) for title in titles)),
+            user_id,
+            self._delete_chunk,
+        )
+
+    async def search_content_service(
+        self, search: str, user_id: str, after: tuple[float, str] | None = None
+    ) -> tuple[list[dict[str, str | float]], str | None]:
+        """Full text search over content title and story
+        Returns the page and the cursor of its last row.
+        """
+
+        if not await self.user_exists(user_id):
+            raise ValueError
+        ts_query = func.websearch_to_tsquery("english", search)
+        rank = func.ts_rank_cd(Content.searchVector, ts_query)
+        query = (
+            select(
+                Content.title,
+                Content.publishedDate,
+                Content.userID,
+                rank.label("rank"),
+                func.ts_headline(
+                    "english", Content.story, ts_query, Config.SEARCH_SNIPPET_OPTIONS
+                ).label("snippet"),
             )
-            result = await db_session.execute(query)
-            latest_content: list[Content] = result.scalars().all()
-            return [
-                {
-                    "title": content.title,  # type: ignore
-                    "story": content.story,  # type: ignore
-                    "publishedDate": str(content.publishedDate),
-                    "userID": content.userID,  # type: ignore
-                }
-                for content in latest_content
-            ]
+            .where(Content.searchVector.op("@@")(ts_query))
+            .order_by(rank.desc(), Content.title)
+            .limit(Config.SEARCH_PAGE_SIZE)
+        )
+        if after is not None:
+            query = query.where(
+                or_(rank < after[0], and_(rank == after[0], Content.title > after[1]))
+            )
+        rows = (await self._read(query, [self.replicas.user(user_id)])).all()
+        next_cursor: str | None = None
+        if len(rows) == Config.SEARCH_PAGE_SIZE:
+            next_cursor = encode_cursor(rows[-1].rank, rows[-1].title)
+        return [
+            {
+                "title": row.title,
+                "snippet": row.snippet,
+                "publishedDate": str(row.publishedDate),
+                "userID": row.userID,
+                "rank": row.rank,
+            }
+            for row in rows
+        ], next_cursor
 
-    async def read_top_content(
-        self, page: int, user_id: str
-    ) -> list[dict[str, str | int]]:
-        """Fetch the top content record sorted by read and likes
-        Send an api call to user interaction server to fetch content
-        read and likes for each content and then sort them and returns
-        based on page number.
-        NOTE: 1 page contains 100 content data.
+    async def export_content_service(
+        self, user_id: str, since: datetime | None, until: datetime | None
+    ) -> AsyncIterator[Sequence[Row]]:
+        """Export content records published in [since, until)
+        Raises before returning when the export query fails.
         """
 
         if not await self.user_exists(user_id):
             raise ValueError
+        query = select(
+            Content.title, Content.story, Content.publishedDate, Content.userID
+        ).order_by(Content.publishedDate, Content.title)
+        if since is not None:
+            query = query.where(Content.publishedDate >= since)
+        if until is not None:
+            query = query.where(Content.publishedDate < until)
+        replica: Replica | None = self.replicas.pick([self.replicas.user(user_id)])
+        if replica is not None:
+            try:
+                return await self._open_stream(query, replica.session)
+            except (DBAPIError, OSError) as error:
+                self.replicas.failed(replica, error)
+        return await self._open_stream(query, self.async_session)
+
+    @classmethod
+    async def _open_stream(
+        cls, query, async_session: sessionmaker
+    ) -> AsyncIterator[Sequence[Row]]:
+        """stream query rows, raising any query error before returning"""
+
+        partitions = cls._stream_rows(query, async_session)
+        first: Sequence[Row] | None = await anext(partitions, None)
+
+        async def stream() -> AsyncIterator[Sequence[Row]]:
+            try:
+                if first is None:
+                    return
+                yield first
+                async for partition in partitions:
+                    yield partition
+            finally:
+                await partitions.aclose()
+
+        return stream()
+
+    @staticmethod
+    async def _stream_rows(
+        query, async_session: sessionmaker
+    ) -> AsyncGenerator[Sequence[Row], None]:
+        """yield query rows in partitions from a server side cursor"""
+
+        async with async_session() as db_session:  # type: ignore
+            result = await db_session.stream(
+                query.execution_options(yield_per=Config.EXPORT_BATCH_SIZE)
+            )
+            async for partition in result.partitions():
+                yield partition
+
+    async def read_content_changes(
+        self, user_id: str, since: tuple[datetime, str] | None = None
+    ) -> tuple[list[dict[str, str | None]], str | None]:
+        """Fetch content changes after `since` in (updatedAt, title) order
+        Returns the changes and the cursor of the last one.
+        """
+
+        if not await self.user_exists(user_id):
+            raise ValueError
+        limit: int = Config.CHANGES_PAGE_SIZE
         async with self.async_session() as db_session:  # type: ignore
-            async with AsyncClient() as client:
-                url: str = f"http://{Config.USER_INTERACTION_HOST}/contents?page={page}"
-                response: Response = await client.get(
-                    url, headers=self.INTERNAL_HEADERS, timeout=10.0
+            horizon: datetime = (
+                await db_session.execute(
+                    self.CHANGES_HORIZON, {"settle": Config.CHANGES_SETTLE_SECONDS}
                 )
-                if response.status_code != self.SUCCESS:
-                    raise ValueError("Error while fetching read and likes")
-                read_like_list: list[dict[str, str | int]] = response.json()
-            titles: list[str] = [
-                each_data["title"] for each_data in read_like_list  # type: ignore
-            ]
-            query = select(
+            ).scalar_one()
+            upserts = select(
                 Content.title,
                 Content.story,
                 Content.publishedDate,
                 Content.userID,
-            ).filter(Content.title.in_(titles))
-            content = await db_session.execute(query)
-            db_data: list[Content] = content.all()
-            curr_data_len: int = len(db_data)
-            if curr_data_len < (page * self.DATA_PER_PAGE):
-                query = (
-                    select(
-                        Content.title,
-                        Content.story,
-                        Content.publishedDate,
-                        Content.userID,
-                    )
-                    .filter(Content.title.not_in(titles))
-                    .offset((page - 1) * self.DATA_PER_PAGE)
-                    .limit((page * self.DATA_PER_PAGE) - curr_data_len)
+                Content.updatedAt,
+                literal(0),
+            ).where(Content.updatedAt < horizon)
+            deletes = select(
+                ContentTombstone.title,
+                null(),
+                null(),
+                null(),
+                ContentTombstone.updatedAt,
+                literal(1),
+            ).where(ContentTombstone.updatedAt < horizon)
+            if since is not None:
+                after = tuple_(literal(since[0]), literal(since[1]))
+                upserts = upserts.where(
+                    tuple_(Content.updatedAt, Content.title) > after
+                )
+                deletes = deletes.where(
+                    tuple_(ContentTombstone.updatedAt, ContentTombstone.title) > after
                 )
-                content = await db_session.execute(query)
-                db_data += content.all()
-            content_dict: dict[str, Content] = {
-                data.title: data for data in db_data  # type: ignore
+            query = union_all(
+                upserts.order_by(Content.updatedAt, Content.title).limit(limit),
+                deletes.order_by(
+                    ContentTombstone.updatedAt, ContentTombstone.title
+                ).limit(limit),
+            )
+            query = query.order_by(
+                query.selected_columns.updatedAt, query.selected_columns.title
+            ).limit(limit)
+            rows = (await db_session.execute(query)).all()
+        changes: list[dict[str, str | None]] = [
+            {"op": "delete", "title": row.title, "updatedAt": row.updatedAt.isoformat()}
+            if row[-1]
+            else {
+                "op": "upsert",
+                "title": row.title,
+                "story": row.story,
+                "publishedDate": str(row.publishedDate),
+                "userID": row.userID,
+                "updatedAt": row.updatedAt.isoformat(),
             }
-            response_data: list[dict[str, str | int]] = [
-                {
-                    "title": content["title"],  # type: ignore
-                    "story": content_dict[content["title"]].story,  # type: ignore
-                    "publishedDate": str(content_dict[content["title"]].publishedDate),
-                    "userID": content_dict[content["title"]].userID,  # type: ignore
-                    "totalReads": content["totalReads"],
-                    "totalLikes": content["totalLikes"],
-                }
-                for content in read_like_list
-            ]
-            response_data += [
-                {
-                    "title": title,  # type: ignore
-                    "story": content.story,  # type: ignore
-                    "publishedDate": str(content.publishedDate),
-                    "userID": content.userID,  # type: ignore
-                    "totalReads": 0,
-                    "totalLikes": 0,
-                }
-                for title, content in content_dict.items()
-            ]
-            return response_data
+            for row in rows
+        ]
+        if rows:
+            return changes, encode_cursor(rows[-1].updatedAt, rows[-1].title)
+        return changes, encode_cursor(*since) if since is not None else None
+
+    @staticmethod
+    def _feed_columns(fields: tuple[str, ...], excerpt: int | None) -> list:
+        """columns selected for a feed page"""
+
+        columns: list = [Content.title, Content.publishedDate]
+        if "story" in fields:
+            story = (
+                Content.story if excerpt is None else func.left(Content.story, excerpt)
+            )
+            columns.append(story.label("story"))
+        if "userID" in fields:
+            columns.append(Content.userID)
+        return columns
+
+    @staticmethod
+    def _feed_item(row: Row, fields: tuple[str, ...]) -> dict[str, str | int]:
+        """response item of a feed page row holding only requested fields"""
+
+        item: dict[str, str | int] = {"title": row.title}
+        if "story" in fields:
+            item["story"] = row.story
+        if "publishedDate" in fields:
+            item["publishedDate"] = str(row.publishedDate)
+        if "userID" in fields:
+            item["userID"] = row.userID
+        return item
+
+    async def read_latest_content(  # pylint: disable=too-many-arguments
+        self,
+        page: int,
+        user_id: str,
+        after: tuple[datetime, str] | None = None,
+        fields: tuple[str, ...] = CONTENT_FIELDS,
+        excerpt: int | None = None,
+    ) -> tuple[list[dict[str, str | int]], str | None]:
+        """Fetch the latest content record sorted by date
+        Returns the page and the cursor of its last row.
+        NOTE: 1 page contains 100 content data.
+        """
+
+        if not await self.user_exists(user_id):
+            raise ValueError
+        query = select(*self._feed_columns(fields, excerpt)).order_by(
+            Content.publishedDate.desc(), Content.title.desc()
+        )
+        if after is not None:
+            query = query.where(
+                tuple_(Content.publishedDate, Content.title)
+                < tuple_(literal(after[0]), literal(after[1]))
+            )
+        else:
+            query = query.offset((page - 1) * self.DATA_PER_PAGE)
+        result = await self._read(
+            query.limit(self.DATA_PER_PAGE), [self.replicas.user(user_id)]
+        )
+        rows = result.all()
+        next_cursor: str | None = None
+        if len(rows) == self.DATA_PER_PAGE:
+            next_cursor = encode_cursor(rows[-1].publishedDate, rows[-1].title)
+        return [self._feed_item(row, fields) for row in rows], next_cursor
+
+    async def read_top_content(
+        self,
+        page: int,
+        user_id: str,
+        fields: tuple[str, ...] = CONTENT_FIELDS,
+        excerpt: int | None = None,
+    ) -> tuple[list[dict[str, str | int]], datetime | None]:
+        """Fetch the top content record sorted by read and likes
+        Returns the page and when the ranking was last refreshed.
+        NOTE: 1 page contains 100 content data.
+        """
+
+        if not await self.user_exists(user_id):
+            raise ValueError
+        return await self.TOP_FLIGHT.do(
+            (page, fields, excerpt),
+            lambda: self._query_top_content(page, fields, excerpt, user_id),
+        )
+
+    async def _query_top_content(
+        self, page: int, fields: tuple[str, ...], excerpt: int | None, user_id: str
+    ) -> tuple[list[dict[str, str | int]], datetime | None]:
+        """run top content query of read_top_content"""
+
+        columns: list = self._feed_columns(fields, excerpt)
+        # no branch needs more rows than the pages up to the requested one
+        depth: int = page * self.DATA_PER_PAGE
+        latest = func.max(ContentRanking.refreshedAt)  # pylint: disable=not-callable
+        refreshed_at = select(latest).scalar_subquery().label("refreshedAt")
+        ranked = (
+            select(
+                *columns,
+                ContentRanking.totalReads,
+                ContentRanking.totalLikes,
+                refreshed_at,
+                literal(0).label("rankGroup"),
+            )
+            .join(ContentRanking, ContentRanking.title == Content.title)
+            .order_by(
+                ContentRanking.totalReads.desc(),
+                ContentRanking.totalLikes.desc(),
+                ContentRanking.title,
+            )
+            .limit(depth)
+        )
+        is_ranked = select(ContentRanking.title).where(
+            ContentRanking.title == Content.title
+        )
+        unranked = (
+            select(*columns, literal(0), literal(0), refreshed_at, literal(1))
+            .where(~is_ranked.exists())
+            .order_by(Content.title)
+            .limit(depth)
+        )
+        query = union_all(ranked, unranked)
+        query = (
+            query.order_by(
+                query.selected_columns.rankGroup,
+                query.selected_columns.totalReads.desc(),
+                query.selected_columns.totalLikes.desc(),
+                query.selected_columns.title,
+            )
+            .offset((page - 1) * self.DATA_PER_PAGE)
+            .limit(self.DATA_PER_PAGE)
+        )
+        result = await self._read(query, [self.replicas.user(user_id)])
+        rows = result.all()
+        return [
+            {
+                **self._feed_item(row, fields),
+                "totalReads": row.totalReads,
+                "totalLikes": row.totalLikes,
+            }
+            for row in rows
+        ], (rows[0].refreshedAt if rows else None)
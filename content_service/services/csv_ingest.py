@@ -0,0 +1,333 @@
+"""Handles incremental parsing of uploaded content csv files"""
+import asyncio
+import csv
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from io import TextIOWrapper
+from typing import IO, AsyncGenerator, Callable, Final
+from dateutil import parser  # type: ignore
+import content_service.settings as Config
+
+STAGING_COLUMNS: Final[tuple[str, ...]] = ("title", "story", "publishedDate", "userID")
+REQUIRED_COLUMNS: Final[tuple[str, ...]] = ("title", "story", "publishedDate")
+ISO_FORMAT: Final[str] = "iso"
+# month first before day first, like the dateutil fallback
+DATE_FORMATS: Final[tuple[str, ...]] = (
+    ISO_FORMAT,
+    "%Y-%m-%d %H:%M:%S",
+    "%Y/%m/%d",
+    "%m/%d/%Y",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%Y %H:%M:%S",
+    "%d/%m/%Y",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y %H:%M:%S",
+    "%m-%d-%Y",
+    "%d-%m-%Y",
+    "%d.%m.%Y",
+    "%d %b %Y",
+    "%d %B %Y",
+    "%b %d %Y",
+    "%b %d, %Y",
+    "%B %d, %Y",
+)
+DATE_SAMPLE_SIZE: Final[int] = 100
+
+
+class InvalidCsvError(Exception):
+    """raised when an upload lacks required columns or is not UTF-8 csv"""
+
+
+@dataclass
+class IngestStats:  # pylint: disable=too-many-instance-attributes
+    """counters of a single csv ingest, updated while it progresses
+    `parse_seconds` sums the time chunks spent being parsed, apart from
+    reading the upload and writing to the database. `rows_written` counts
+    contents inserted or changed by the merge of staged rows.
+    """
+
+    rows_parsed: int = 0
+    rows_staged: int = 0
+    rows_written: int = 0
+    rows_rejected: int = 0
+    parse_seconds: float = 0.0
+    date_format: str | None = None
+    rejections: list[dict[str, int | str]] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+    finished: float = 0.0
+
+    @property
+    def seconds(self) -> float:
+        """wall time of the ingest so far"""
+
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        """ingest throughput"""
+
+        return self.rows_staged / self.seconds if self.seconds else 0.0
+
+    @property
+    def parse_rows_per_second(self) -> float:
+        """parse throughput of a single parser"""
+
+        return self.rows_parsed / self.parse_seconds if self.parse_seconds else 0.0
+
+    def reject(self, rejections: list[dict[str, int | str]]) -> None:
+        """count rejected rows, reporting the first INGEST_MAX_REJECTIONS"""
+
+        self.rows_rejected += len(rejections)
+        room: int = Config.INGEST_MAX_REJECTIONS - len(self.rejections)
+        self.rejections.extend(rejections[: max(room, 0)])
+
+    def to_dict(self) -> dict[str, int | float | str | list | None]:
+        """progress payload"""
+
+        return {
+            "rowsParsed": self.rows_parsed,
+            "rowsStaged": self.rows_staged,
+            "rowsWritten": self.rows_written,
+            "rowsRejected": self.rows_rejected,
+            "seconds": round(self.seconds, 3),
+            "rowsPerSecond": round(self.rows_per_second, 2),
+            "parseSeconds": round(self.parse_seconds, 3),
+            "parseRowsPerSecond": round(self.parse_rows_per_second, 2),
+            "dateFormat": self.date_format,
+            "rejections": self.rejections,
+        }
+
+
+def _matches(date_format: str, value: str) -> bool:
+    """check if value parses with date_format"""
+
+    try:
+        if date_format == ISO_FORMAT:
+            datetime.fromisoformat(value)
+        else:
+            datetime.strptime(value, date_format)
+        return True
+    except ValueError:
+        return False
+
+
+def infer_date_format(values: list[str]) -> str | None:
+    """first of DATE_FORMATS parsing the most sampled values, None when no
+    format parses any and every row falls back to dateutil.
+    """
+
+    samples: list[str] = [value for value in values if value]
+    inferred: str | None = None
+    most: int = 0
+    for date_format in DATE_FORMATS:
+        matched: int = sum(_matches(date_format, value) for value in samples)
+        if matched > most:
+            inferred, most = date_format, matched
+        if most == len(samples):
+            break
+    return inferred
+
+
+def date_parser(date_format: str | None) -> Callable[[str], datetime]:
+    """parse with the inferred format, dateutil only on mismatches"""
+
+    if date_format is None:
+        return parser.parse
+
+    def parse(value: str) -> datetime:
+        try:
+            if date_format == ISO_FORMAT:
+                return datetime.fromisoformat(value)
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            return parser.parse(value)
+
+    return parse
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """value as naive UTC, naive values are taken as UTC already"""
+
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def parse_rows(  # pylint: disable=too-many-arguments
+    rows: list[list[str]],
+    first_row: int,
+    positions: tuple[int, int, int],
+    date_format: str | None,
+    user_id: str,
+) -> tuple[list[tuple], list[dict[str, int | str]], float]:
+    """Parse raw csv rows into staging records.
+    title -> replace space to underscore and all letters to lower
+    Dates with an offset are stored as naive UTC. Returns the records, a
+    rejection per unusable row numbered from `first_row` and the seconds
+    spent. Runs in ingest worker threads or parse processes.
+    """
+
+    started: float = time.perf_counter()
+    parse_date: Callable[[str], datetime] = date_parser(date_format)
+    title_at, story_at, date_at = positions
+    records: list[tuple] = []
+    rejections: list[dict[str, int | str]] = []
+    for number, row in enumerate(rows, first_row):
+        try:
+            title: str = row[title_at].lower().replace(" ", "_")
+            if not title:
+                rejections.append({"row": number, "error": "title is empty"})
+                continue
+            records.append(
+                (title, row[story_at], _naive_utc(parse_date(row[date_at])), user_id)
+            )
+        except IndexError:
+            rejections.append({"row": number, "error": "missing columns"})
+        except (ValueError, OverflowError):
+            rejections.append(
+                {"row": number, "error": f"invalid publishedDate {row[date_at]!r}"}
+            )
+    return records, rejections, time.perf_counter() - started
+
+
+class CsvReader:
+    """raw rows of a csv upload read in chunks, header resolved on open"""
+
+    def __init__(self, csv_file: IO[bytes], chunk_size: int) -> None:
+        self.chunk_size: int = chunk_size
+        self._text = TextIOWrapper(
+            csv_file, encoding="utf-8-sig", newline=""  # type: ignore
+        )
+        self._reader = csv.reader(self._text)
+        header: list[str] = [name.strip() for name in self._next() or []]
+        if not set(REQUIRED_COLUMNS) <= set(header):
+            self.close()
+            raise InvalidCsvError(f"csv header must contain {REQUIRED_COLUMNS}")
+        self.positions: tuple[int, int, int] = tuple(  # type: ignore
+            header.index(column) for column in REQUIRED_COLUMNS
+        )
+
+    def _next(self) -> list[str] | None:
+        """next csv row, None at the end of the upload"""
+
+        try:
+            return next(self._reader, None)
+        except (UnicodeDecodeError, csv.Error) as error:
+            raise InvalidCsvError(str(error)) from error
+
+    def read(self) -> list[list[str]]:
+        """next chunk of non blank rows, empty at the end of the upload"""
+
+        rows: list[list[str]] = []
+        while len(rows) < self.chunk_size and (row := self._next()) is not None:
+            if row:
+                rows.append(row)
+        return rows
+
+    def close(self) -> None:
+        """leave the upload open, it is owned and closed by the caller"""
+
+        self._text.detach()
+
+
+class ParsePool:
+    """process pool parsing chunks of large uploads, started on first use
+    Spawned rather than forked, parse processes never inherit the event
+    loop or database connections of the worker.
+    """
+
+    def __init__(self, processes: int) -> None:
+        self.processes: int = processes
+        self._executor: ProcessPoolExecutor | None = None
+
+    def executor(self) -> ProcessPoolExecutor:
+        """shared process pool"""
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                self.processes, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def close(self) -> None:
+        """stop parse processes"""
+
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+PARSE_POOL: ParsePool = ParsePool(Config.INGEST_PARSE_PROCESSES)
+
+
+def _upload_size(csv_file: IO[bytes]) -> int:
+    """size of a seekable upload in bytes"""
+
+    position: int = csv_file.tell()
+    size: int = csv_file.seek(0, os.SEEK_END)
+    csv_file.seek(position)
+    return size
+
+
+async def parse_upload(
+    csv_file: IO[bytes], user_id: str, stats: IngestStats
+) -> AsyncGenerator[list[tuple], None]:
+    """Parse csv upload lazily into batches of staging records.
+    The date format is inferred once from the first rows. Uploads of
+    INGEST_PARALLEL_MIN_BYTES or more are parsed in chunks on PARSE_POOL,
+    smaller ones in a thread. Up to one chunk per parser is parsed ahead
+    while the caller writes the previous batch, so memory stays bounded
+    by a few chunks. Unusable rows are reported through `stats` instead
+    of failing the upload.
+    """
+
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    executor: Executor | None = None
+    depth: int = 2
+    if (
+        PARSE_POOL.processes > 0
+        and _upload_size(csv_file) >= Config.INGEST_PARALLEL_MIN_BYTES
+    ):
+        executor, depth = PARSE_POOL.executor(), PARSE_POOL.processes + 1
+    reader: CsvReader = await loop.run_in_executor(
+        None, CsvReader, csv_file, Config.INGEST_BATCH_SIZE
+    )
+    pending: deque[asyncio.Future] = deque()
+    try:
+        rows: list[list[str]] = await loop.run_in_executor(None, reader.read)
+        date_at: int = reader.positions[2]
+        stats.date_format = infer_date_format(
+            [row[date_at] for row in rows[:DATE_SAMPLE_SIZE] if len(row) > date_at]
+        )
+        first_row: int = 1
+        while rows or pending:
+            if rows:
+                pending.append(
+                    loop.run_in_executor(
+                        executor,
+                        parse_rows,
+                        rows,
+                        first_row,
+                        reader.positions,
+                        stats.date_format,
+                        user_id,
+                    )
+                )
+                first_row += len(rows)
+                rows = await loop.run_in_executor(None, reader.read)
+            if len(pending) >= depth or not rows:
+                records, rejections, seconds = await pending.popleft()
+                stats.rows_parsed += len(records) + len(rejections)
+                stats.parse_seconds += seconds
+                stats.reject(rejections)
+                if records:
+                    yield records
+    finally:
+        for future in pending:
+            future.cancel()
+        reader.close()
@@ -0,0 +1,29 @@
+"""Handles opaque keyset pagination cursors"""
+import base64
+import json
+from datetime import datetime
+
+
+class InvalidCursorError(Exception):
+    """raised when a pagination cursor can not be decoded"""
+
+
+def encode_cursor(*values: str | float | datetime) -> str:
+    """encode the sort key of the last row of a page"""
+
+    payload: list = [
+        value.isoformat() if isinstance(value, datetime) else value for value in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """decode a cursor produced by encode_cursor into its `size` values"""
+
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError as error:
+        raise InvalidCursorError(cursor) from error
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorError(cursor)
+    return values
@@ -0,0 +1,121 @@
+"""Handles conditional requests and compression of responses"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Final
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Message, Receive, Scope, Send
+
+NOT_MODIFIED: Final[int] = 304
+EPOCH: Final[datetime] = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# clients may keep responses but must revalidate them before every use
+REVALIDATE: Final[str] = "no-cache"
+# entity headers left out of 304 responses
+ENTITY_HEADERS: Final[frozenset[str]] = frozenset(("content-length", "content-type"))
+
+
+def version_etag(version: datetime) -> str:
+    """strong ETag of a resource versioned by its last update time"""
+
+    return f'"{(version - EPOCH) // timedelta(microseconds=1):x}"'
+
+
+def body_etag(body: bytes, weak: bool = False) -> str:
+    """ETag of response bytes, weak ones only promise equivalent content"""
+
+    digest: str = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def http_date(moment: datetime) -> str:
+    """Last-Modified representation of an aware datetime"""
+
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def _opaque_tag(etag: str) -> str:
+    """ETag without its weakness marker, for weak comparison"""
+
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def not_modified(
+    request: Request, etag: str, last_modified: datetime | None = None
+) -> bool:
+    """Check whether the client already holds the current representation
+    If-None-Match is compared weakly against `etag`, If-Modified-Since
+    is only looked at when If-None-Match is absent and has a resolution
+    of seconds.
+    """
+
+    if_none_match: str | None = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags: set[str] = {_opaque_tag(tag) for tag in if_none_match.split(",")}
+        return "*" in tags or _opaque_tag(etag) in tags
+    if_modified_since: str | None = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since: datetime = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def not_modified_response(headers: MutableHeaders | dict[str, str]) -> Response:
+    """304 carrying the validators and other headers of the full response"""
+
+    return Response(
+        status_code=NOT_MODIFIED,
+        headers={
+            name: value
+            for name, value in headers.items()
+            if name.lower() not in ENTITY_HEADERS
+        },
+    )
+
+
+def validate_page(request: Request, response: Response) -> Response:
+    """Tag a rendered feed page with a weak ETag of its body
+    Pages are built from several rows and rankings which carry no single
+    version, so the page is still queried and rendered, only sending it
+    again is saved by answering 304.
+    """
+
+    etag: str = body_etag(response.body, weak=True)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = REVALIDATE
+    if not_modified(request, etag):
+        return not_modified_response(response.headers)
+    return response
+
+
+class CompressionMiddleware(GZipMiddleware):  # pylint: disable=too-few-public-methods
+    """gzip responses of `minimum_size` bytes or more for clients accepting it
+    A strong ETag names the exact bytes of the identity response, so it
+    is weakened on compressed responses. If-None-Match is compared weakly
+    and keeps matching either form.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers: MutableHeaders = MutableHeaders(scope=message)
+                etag: str | None = headers.get("etag")
+                if headers.get("content-encoding") == "gzip" and (
+                    etag is not None and not etag.startswith("W/")
+                ):
+                    headers["ETag"] = f"W/{etag}"
+            await send(message)
+
+        await super().__call__(scope, receive, send_wrapper)
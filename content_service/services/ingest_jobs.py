@@ -0,0 +1,143 @@
+"""Handles queued csv ingest jobs processed by a bounded worker pool"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import IO, Awaitable, Callable, Final
+from content_service.services.csv_ingest import IngestStats
+from content_service.services.metrics import (
+    INGEST_DURATION,
+    INGEST_JOBS,
+    INGEST_PARSE_ROWS_PER_SECOND,
+    INGEST_ROWS,
+    INGEST_ROWS_PER_SECOND,
+)
+
+IngestHandler = Callable[[IO[bytes], str, IngestStats], Awaitable[IngestStats]]
+
+
+class IngestJob:  # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    """a single csv upload waiting for or processed by an ingest worker"""
+
+    QUEUED: Final[str] = "queued"
+    RUNNING: Final[str] = "running"
+    COMPLETED: Final[str] = "completed"
+    FAILED: Final[str] = "failed"
+
+    def __init__(self, csv_file: IO[bytes], user_id: str) -> None:
+        self.job_id: str = uuid.uuid4().hex
+        self.csv_file: IO[bytes] = csv_file
+        self.user_id: str = user_id
+        self.status: str = self.QUEUED
+        self.stats: IngestStats = IngestStats()
+        self.error: BaseException | None = None
+        self.created_at: float = time.time()
+        self.done: asyncio.Event = asyncio.Event()
+
+    def to_dict(self) -> dict[str, str | int | float | list | None]:
+        """job status payload"""
+
+        return {
+            "jobId": self.job_id,
+            "status": self.status,
+            "createdAt": self.created_at,
+            "error": repr(self.error) if self.error else None,
+            **(self.stats.to_dict() if self.status != self.QUEUED else {}),
+        }
+
+
+class IngestJobManager:
+    """bounded queue of ingest jobs drained by a fixed number of workers
+    Every ingest, queued or awaited inline, runs on one of `workers`
+    tasks, so ingest never holds more than `workers` db connections and
+    cannot starve the read endpoints of the shared connection pool.
+    Jobs live in worker memory, a job id is only known by the worker
+    process which accepted the upload.
+    """
+
+    def __init__(
+        self, handler: IngestHandler, workers: int, max_queued: int, history: int
+    ) -> None:
+        self.handler: IngestHandler = handler
+        self.workers: int = workers
+        self.history: int = history
+        self._queue: asyncio.Queue[IngestJob] = asyncio.Queue(max_queued)
+        self._jobs: OrderedDict[str, IngestJob] = OrderedDict()
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """spawn ingest workers"""
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        """stop ingest workers, unfinished jobs are dropped"""
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, csv_file: IO[bytes], user_id: str) -> IngestJob:
+        """queue csv upload for ingest, the job takes ownership of csv_file
+        raises asyncio.QueueFull when too many jobs are waiting.
+        """
+
+        job: IngestJob = IngestJob(csv_file, user_id)
+        self._queue.put_nowait(job)
+        self._jobs[job.job_id] = job
+        self._trim_history()
+        return job
+
+    def get(self, job_id: str) -> IngestJob | None:
+        """fetch job by id"""
+
+        return self._jobs.get(job_id)
+
+    def stats(self) -> dict[str, int]:
+        """queue occupancy"""
+
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize(),
+            "tracked": len(self._jobs),
+        }
+
+    def _trim_history(self) -> None:
+        """forget oldest finished jobs beyond history limit"""
+
+        finished: list[str] = [
+            job_id for job_id, job in self._jobs.items() if job.done.is_set()
+        ]
+        for job_id in finished[: max(len(finished) - self.history, 0)]:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _record(job: IngestJob) -> None:
+        """export counters of a finished job"""
+
+        INGEST_JOBS.labels(job.status).inc()
+        INGEST_ROWS.labels("written").inc(job.stats.rows_written)
+        INGEST_ROWS.labels("rejected").inc(job.stats.rows_rejected)
+        INGEST_DURATION.observe(job.stats.seconds)
+        INGEST_ROWS_PER_SECOND.set(job.stats.rows_per_second)
+        INGEST_PARSE_ROWS_PER_SECOND.set(job.stats.parse_rows_per_second)
+
+    async def _worker(self) -> None:
+        """process queued jobs one at a time"""
+
+        while True:
+            job: IngestJob = await self._queue.get()
+            job.status = job.RUNNING
+            try:
+                await self.handler(job.csv_file, job.user_id, job.stats)
+                job.status = job.COMPLETED
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                job.status = job.FAILED
+                job.error = error
+            finally:
+                job.stats.finished = time.perf_counter()
+                self._record(job)
+                job.csv_file.close()
+                job.done.set()
+                self._queue.task_done()
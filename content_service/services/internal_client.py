@@ -0,0 +1,200 @@
+"""Handles pooled http communication with sibling services"""
+import asyncio
+import random
+import time
+from typing import Final
+from httpx import AsyncClient, Limits, Response, Timeout, TransportError
+from content_service.services.metrics import UPSTREAM_REQUEST_DURATION
+import content_service.settings as Config
+
+
+class CircuitOpenError(TransportError):
+    """raised instead of calling an upstream host whose circuit is open"""
+
+
+class UpstreamUnavailableError(TransportError):
+    """raised when an upstream host still answers 502, 503 or 504 after retries"""
+
+
+class CircuitBreaker:
+    """consecutive failure circuit breaker for a single upstream host
+    closed -> open after `failure_threshold` failures in a row,
+    open -> half open once `reset_timeout` seconds passed, then a single
+    trial request decides whether the circuit closes or opens again.
+    """
+
+    CLOSED: Final[str] = "closed"
+    OPEN: Final[str] = "open"
+    HALF_OPEN: Final[str] = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+        self.state: str = self.CLOSED
+        self.failures: int = 0
+        self.opened_at: float = 0.0
+        self.rejected: int = 0
+        self.trips: int = 0
+
+    def allow(self) -> bool:
+        """check if a request may be sent upstream"""
+
+        if self.state == self.CLOSED:
+            return True
+        # a trial that never reported back is retried after another timeout
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self.opened_at = time.monotonic()
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        """close the circuit after a successful call"""
+
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        """count a failed call and open the circuit if needed"""
+
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict[str, str | int]:
+        """breaker state and counters"""
+
+        return {
+            "state": self.state,
+            "consecutiveFailures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+
+class InternalClient:
+    """long lived client for internal services
+    One keep-alive connection pool and circuit breaker per upstream host,
+    idempotent GET requests are retried with jittered exponential backoff.
+    """
+
+    RETRY_STATUSES: Final[frozenset[int]] = frozenset({502, 503, 504})
+    INTERNAL_HEADERS: dict[str, str] = {
+        "x-internal": "groot",
+    }
+
+    def __init__(self) -> None:
+        self._clients: dict[str, AsyncClient] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._counters: dict[str, dict[str, int]] = {}
+
+    def _client(self, host: str) -> AsyncClient:
+        """pooled client for host, created on first use"""
+
+        if host not in self._clients:
+            self._clients[host] = AsyncClient(
+                base_url=f"http://{host}",
+                headers=self.INTERNAL_HEADERS,
+                limits=Limits(
+                    max_connections=Config.INTERNAL_MAX_CONNECTIONS,
+                    max_keepalive_connections=Config.INTERNAL_MAX_KEEPALIVE,
+                    keepalive_expiry=Config.INTERNAL_KEEPALIVE_EXPIRY,
+                ),
+                timeout=Timeout(
+                    Config.INTERNAL_READ_TIMEOUT,
+                    connect=Config.INTERNAL_CONNECT_TIMEOUT,
+                    pool=Config.INTERNAL_POOL_TIMEOUT,
+                ),
+            )
+            self._breakers[host] = CircuitBreaker(
+                Config.BREAKER_FAILURE_THRESHOLD, Config.BREAKER_RESET_TIMEOUT
+            )
+            self._counters[host] = {
+                "requests": 0,
+                "inFlight": 0,
+                "retries": 0,
+                "failures": 0,
+            }
+        return self._clients[host]
+
+    async def get(self, host: str, path: str) -> Response:
+        """send GET request to internal host
+        raises CircuitOpenError without touching the network while the
+        breaker for host is open, otherwise the last transport error or
+        UpstreamUnavailableError once retries are exhausted.
+        """
+
+        client: AsyncClient = self._client(host)
+        breaker: CircuitBreaker = self._breakers[host]
+        counters: dict[str, int] = self._counters[host]
+        if not breaker.allow():
+            raise CircuitOpenError(f"circuit open for {host}")
+        counters["requests"] += 1
+        counters["inFlight"] += 1
+        try:
+            for attempt in range(Config.INTERNAL_RETRIES + 1):
+                if attempt:
+                    counters["retries"] += 1
+                    await asyncio.sleep(
+                        random.uniform(0, Config.INTERNAL_RETRY_BACKOFF * 2**attempt)
+                    )
+                started: float = time.perf_counter()
+                try:
+                    response: Response = await client.get(path)
+                except TransportError:
+                    UPSTREAM_REQUEST_DURATION.labels(host, "error").observe(
+                        time.perf_counter() - started
+                    )
+                    if attempt == Config.INTERNAL_RETRIES:
+                        counters["failures"] += 1
+                        breaker.record_failure()
+                        raise
+                    continue
+                UPSTREAM_REQUEST_DURATION.labels(
+                    host, str(response.status_code)
+                ).observe(time.perf_counter() - started)
+                if (
+                    response.status_code not in self.RETRY_STATUSES
+                    or attempt == Config.INTERNAL_RETRIES
+                ):
+                    break
+            if response.status_code in self.RETRY_STATUSES:
+                counters["failures"] += 1
+                breaker.record_failure()
+                raise UpstreamUnavailableError(
+                    f"{host} answered {response.status_code}",
+                    request=response.request,
+                )
+            breaker.record_success()
+            return response
+        finally:
+            counters["inFlight"] -= 1
+
+    async def close(self) -> None:
+        """close every pooled connection"""
+
+        clients: list[AsyncClient] = list(self._clients.values())
+        self._clients.clear()
+        await asyncio.gather(*(client.aclose() for client in clients))
+
+    def stats(self) -> dict[str, dict]:
+        """request counters, pool occupancy and breaker state per host
+        Every request in flight holds one pooled connection, out of
+        `maxConnections` per host.
+        """
+
+        return {
+            host: {
+                **self._counters[host],
+                "maxConnections": Config.INTERNAL_MAX_CONNECTIONS,
+                "breaker": self._breakers[host].stats(),
+            }
+            for host in self._clients
+        }
+
+
+INTERNAL_CLIENT: InternalClient = InternalClient()
@@ -0,0 +1,406 @@
+"""Handles in-process metrics exposed in prometheus text format"""
+import math
+import re
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Any, Callable, Final, Iterator
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS: Final[tuple[float, ...]] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+STATEMENT_VERB: Final[re.Pattern] = re.compile(r"\s*(\w+)")
+
+
+def _escape(value: str) -> str:
+    """escape label value for the text exposition format"""
+
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    """render sample value, infinities the way prometheus spells them"""
+
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(value)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    """render {name="value",...} or nothing for unlabelled samples"""
+
+    if not names:
+        return ""
+    pairs: str = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+    return f"{{{pairs}}}"
+
+
+class Metric(ABC):
+    """family of samples sharing name and label names
+    Children are created on first use of a label combination and kept
+    for the process lifetime, so label values must be low cardinality.
+    """
+
+    TYPE: str = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+        self.label_names: tuple[str, ...] = labels
+        self._children: dict[tuple[str, ...], Any] = {}
+        if not labels:
+            self.labels()
+
+    def labels(self, *values: str) -> Any:
+        """child sample for the given label values"""
+
+        child: Any = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    @abstractmethod
+    def _new_child(self) -> Any:
+        """sample of a new label combination"""
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """sample lines of every child"""
+
+    def render(self) -> str:
+        """HELP, TYPE and sample lines of this family"""
+
+        lines: list[str] = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.TYPE}",
+            *self.samples(),
+        ]
+        return "\n".join(lines)
+
+
+class Value:
+    """single float sample of a counter or gauge"""
+
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value: float = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        """add amount"""
+
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        """subtract amount"""
+
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        """replace value"""
+
+        self.value = value
+
+
+class Counter(Metric):
+    """monotonically increasing count, named with its _total suffix"""
+
+    TYPE = "counter"
+
+    def _new_child(self) -> Value:
+        return Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """add amount to the unlabelled sample"""
+
+        self.labels().inc(amount)
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._children.items():
+            labels: str = _format_labels(self.label_names, values)
+            yield f"{self.name}{labels} {_format_value(child.value)}"
+
+
+class Gauge(Counter):
+    """value which goes up and down"""
+
+    TYPE = "gauge"
+
+    def dec(self, amount: float = 1.0) -> None:
+        """subtract amount from the unlabelled sample"""
+
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        """replace the unlabelled sample"""
+
+        self.labels().set(value)
+
+
+class Observations:  # pylint: disable=too-few-public-methods
+    """bucket counts, sum and count of a histogram child"""
+
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets: tuple[float, ...] = buckets
+        # last slot counts observations above the largest bucket
+        self.counts: list[int] = [0] * (len(buckets) + 1)
+        self.sum: float = 0.0
+
+    def observe(self, value: float) -> None:
+        """record one observation"""
+
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Histogram(Metric):
+    """distribution of observed values over fixed buckets"""
+
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        self.buckets: tuple[float, ...] = buckets
+        super().__init__(name, documentation, labels)
+
+    def _new_child(self) -> Observations:
+        return Observations(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """record one observation on the unlabelled sample"""
+
+        self.labels().observe(value)
+
+    def samples(self) -> Iterator[str]:
+        names: tuple[str, ...] = (*self.label_names, "le")
+        for values, child in self._children.items():
+            cumulative: int = 0
+            for bound, count in zip((*self.buckets, "+Inf"), child.counts):
+                cumulative += count
+                labels: str = _format_labels(names, (*values, str(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.label_names, values)
+            yield f"{self.name}_sum{labels} {child.sum}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    """collection of metric families rendered together"""
+
+    CONTENT_TYPE: Final[str] = "text/plain; version=0.0.4"
+
+    def __init__(self) -> None:
+        self._metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Any:
+        """add metric to the exposition, returns it"""
+
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """every registered family in prometheus text format"""
+
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+METRICS: MetricsRegistry = MetricsRegistry()
+
+HTTP_REQUESTS: Counter = METRICS.register(
+    Counter(
+        "http_requests_total",
+        "HTTP responses by route and status code",
+        ("method", "route", "status"),
+    )
+)
+HTTP_REQUEST_DURATION: Histogram = METRICS.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency until the last response byte",
+        ("method", "route"),
+    )
+)
+HTTP_IN_FLIGHT: Gauge = METRICS.register(
+    Gauge("http_requests_in_flight", "HTTP requests being served")
+)
+DB_POOL_CHECKOUT: Histogram = METRICS.register(
+    Histogram(
+        "db_pool_checkout_wait_seconds",
+        "Time spent waiting for a pooled database connection",
+    )
+)
+DB_STATEMENT_DURATION: Histogram = METRICS.register(
+    Histogram(
+        "db_statement_duration_seconds",
+        "Database statement execution time by statement verb",
+        ("statement",),
+    )
+)
+UPSTREAM_REQUEST_DURATION: Histogram = METRICS.register(
+    Histogram(
+        "upstream_request_duration_seconds",
+        "Internal service request latency per attempt",
+        ("host", "status"),
+    )
+)
+ADMISSION_IN_FLIGHT: Gauge = METRICS.register(
+    Gauge(
+        "admission_in_flight",
+        "Requests holding an admission slot by route class",
+        ("route_class",),
+    )
+)
+SHED_REQUESTS: Counter = METRICS.register(
+    Counter(
+        "shed_requests_total",
+        "Requests answered 503 by admission control",
+        ("route_class", "reason"),
+    )
+)
+COALESCED_CALLS: Counter = METRICS.register(
+    Counter(
+        "coalesced_calls_total",
+        "Single flight calls started (leader) or joined (follower)",
+        ("flight", "role"),
+    )
+)
+INGEST_ROWS: Counter = METRICS.register(
+    Counter("ingest_rows_total", "CSV rows handled by ingest", ("result",))
+)
+INGEST_JOBS: Counter = METRICS.register(
+    Counter("ingest_jobs_total", "Finished CSV ingest jobs", ("status",))
+)
+INGEST_DURATION: Histogram = METRICS.register(
+    Histogram(
+        "ingest_duration_seconds",
+        "Wall time of finished CSV ingest jobs",
+        buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+    )
+)
+INGEST_ROWS_PER_SECOND: Gauge = METRICS.register(
+    Gauge("ingest_rows_per_second", "Throughput of the last finished CSV ingest")
+)
+INGEST_PARSE_ROWS_PER_SECOND: Gauge = METRICS.register(
+    Gauge(
+        "ingest_parse_rows_per_second",
+        "Parse throughput of a single parser in the last finished CSV ingest",
+    )
+)
+
+ROUTED_READS: Counter = METRICS.register(
+    Counter(
+        "routed_reads_total",
+        "Reads by the database they were routed to and why",
+        ("target", "reason"),
+    )
+)
+REPLICA_LAG: Gauge = METRICS.register(
+    Gauge(
+        "replica_lag_seconds",
+        "Replication lag at the last health check, +Inf when unhealthy",
+        ("replica",),
+    )
+)
+
+
+class TimedAsyncPool(AsyncAdaptedQueuePool):
+    """async queue pool recording how long each checkout waits
+    The wait covers queueing for a free connection and, when the pool
+    grows, opening a new one.
+    """
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started: float = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT.observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """time every statement executed through engine by its leading verb"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, *_):
+        conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, _cursor, statement, *_):
+        elapsed: float = time.perf_counter() - conn.info["statement_started"].pop()
+        verb: re.Match | None = STATEMENT_VERB.match(statement)
+        DB_STATEMENT_DURATION.labels(
+            verb.group(1).upper() if verb else "UNKNOWN"
+        ).observe(elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("statement_started"):
+            connection.info["statement_started"].pop()
+
+
+class MetricsMiddleware:  # pylint: disable=too-few-public-methods
+    """ASGI middleware recording latency, status and in-flight requests
+    Requests are labelled by route path template, looked up from the
+    endpoint the router matched, so title paths share a single series.
+    """
+
+    UNMATCHED: Final[str] = "unmatched"
+
+    def __init__(self, app: ASGIApp, routes: list) -> None:
+        self.app: ASGIApp = app
+        self.paths: dict[Callable, str] = {
+            route.endpoint: route.path for route in routes
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status: int = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started: float = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            endpoint: Callable | None = scope.get("endpoint")
+            route: str = (
+                self.paths.get(endpoint, self.UNMATCHED) if endpoint else self.UNMATCHED
+            )
+            HTTP_REQUEST_DURATION.labels(scope["method"], route).observe(
+                time.perf_counter() - started
+            )
+            HTTP_REQUESTS.labels(scope["method"], route, str(status)).inc()
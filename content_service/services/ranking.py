@@ -0,0 +1,145 @@
+"""Handles background sync of content reads and likes into ContentRanking"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Final
+from httpx import Response
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import sessionmaker
+from content_service.models import ContentRanking
+from content_service.services.background import BackgroundTask
+from content_service.services.internal_client import InternalClient
+import content_service.settings as Config
+
+
+class RankingRefresher:
+    """periodically mirrors user interaction service rankings locally
+    Every page is fetched before a short transaction upserts them and drops
+    titles absent from a complete sync. Workers skip a sync when the ranking
+    was refreshed within the interval, a transaction level advisory lock
+    lets only one of them write it.
+    """
+
+    SUCCESS: Final[int] = 200
+    LOCK_KEY: Final[int] = 0x636F6E74656E74  # "content"
+
+    def __init__(self, async_session: sessionmaker, client: InternalClient) -> None:
+        self.async_session: sessionmaker = async_session
+        self.client: InternalClient = client
+        self.refreshed_at: datetime | None = None
+        self.last_error: str | None = None
+        self.cycles: int = 0
+        self._loop: BackgroundTask = BackgroundTask(self._run)
+
+    async def _recently_refreshed(self) -> bool:
+        """check if any worker synced within RANKING_REFRESH_INTERVAL"""
+
+        latest = func.max(ContentRanking.refreshedAt)  # pylint: disable=not-callable
+        async with self.async_session() as db_session:  # type: ignore
+            refreshed_at: datetime | None = (
+                await db_session.execute(select(latest))
+            ).scalar()
+        return refreshed_at is not None and (
+            datetime.now(timezone.utc) - refreshed_at
+        ) < timedelta(seconds=Config.RANKING_REFRESH_INTERVAL)
+
+    async def _fetch_pages(self) -> tuple[list[list[dict[str, str | int]]], bool]:
+        """fetch ranking pages, and whether the last page was reached
+        within RANKING_MAX_PAGES
+        """
+
+        pages: list[list[dict[str, str | int]]] = []
+        for page in range(1, Config.RANKING_MAX_PAGES + 1):
+            response: Response = await self.client.get(
+                Config.USER_INTERACTION_HOST, f"/contents?page={page}"
+            )
+            if response.status_code != self.SUCCESS:
+                raise ValueError("Error while fetching read and likes")
+            read_like_list: list[dict[str, str | int]] = response.json()
+            if not read_like_list:
+                return pages, True
+            pages.append(read_like_list)
+        return pages, False
+
+    async def refresh(self) -> int:
+        """sync every ranking page, returns number of titles upserted
+        or -1 when another worker synced it.
+        """
+
+        if await self._recently_refreshed():
+            return -1
+        pages, complete = await self._fetch_pages()
+        synced: int = 0
+        # now() is the transaction start, every row synced has it
+        now = func.now()  # pylint: disable=not-callable
+        async with self.async_session() as db_session:  # type: ignore
+            try:
+                locked = await db_session.execute(
+                    select(func.pg_try_advisory_xact_lock(self.LOCK_KEY))
+                )
+                if not locked.scalar():
+                    return -1
+                for read_like_list in pages:
+                    query = insert(ContentRanking).values(
+                        [
+                            {
+                                "title": data["title"],
+                                "totalReads": data["totalReads"],
+                                "totalLikes": data["totalLikes"],
+                                "refreshedAt": now,
+                            }
+                            for data in read_like_list
+                        ]
+                    )
+                    query = query.on_conflict_do_update(
+                        index_elements=["title"],
+                        set_={
+                            "totalReads": query.excluded.totalReads,
+                            "totalLikes": query.excluded.totalLikes,
+                            "refreshedAt": query.excluded.refreshedAt,
+                        },
+                    )
+                    await db_session.execute(query)
+                    synced += len(read_like_list)
+                # a ranking longer than RANKING_MAX_PAGES keeps its tail
+                if complete:
+                    await db_session.execute(
+                        delete(ContentRanking).where(ContentRanking.refreshedAt < now)
+                    )
+                await db_session.commit()
+                return synced
+            except Exception as error:
+                await db_session.rollback()
+                raise error
+
+    async def start(self) -> None:
+        """spawn background refresh loop"""
+
+        self._loop.start()
+
+    async def close(self) -> None:
+        """stop background refresh loop"""
+
+        await self._loop.stop()
+
+    async def _run(self) -> None:
+        """refresh forever, upstream failures only delay the next sync"""
+
+        while True:
+            try:
+                if await self.refresh() >= 0:
+                    self.refreshed_at = datetime.now(timezone.utc)
+                    self.cycles += 1
+                self.last_error = None
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                self.last_error = repr(error)
+            await asyncio.sleep(Config.RANKING_REFRESH_INTERVAL)
+
+    def stats(self) -> dict[str, str | int | None]:
+        """last sync of this worker"""
+
+        return {
+            "refreshedAt": self.refreshed_at.isoformat() if self.refreshed_at else None,
+            "cycles": self.cycles,
+            "lastError": self.last_error,
+        }
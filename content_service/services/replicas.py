@@ -0,0 +1,296 @@
+"""Handles routing of reads to read replica databases"""
+import asyncio
+import itertools
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Collection, Final, Hashable, Iterable
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from content_service.models import open_engine
+from content_service.services.background import BackgroundTask
+from content_service.services.metrics import REPLICA_LAG, ROUTED_READS
+import content_service.settings as Config
+
+# replayed WAL position of a standby and seconds it is behind its primary,
+# 0 while it streams and replayed everything it received
+HEALTH_QUERY = text(
+    "SELECT pg_is_in_recovery() AS standby, "
+    "pg_wal_lsn_diff(pg_last_wal_replay_lsn(), '0/0') AS replayed, "
+    "CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "AND EXISTS (SELECT FROM pg_stat_wal_receiver WHERE status = 'streaming') "
+    "THEN 0 ELSE extract(epoch FROM clock_timestamp() "
+    "- pg_last_xact_replay_timestamp()) END AS lag"
+)
+WAL_POSITION = text("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), '0/0')")
+
+
+@dataclass
+class ReplicaHealth:
+    """outcome of the last health check of a replica"""
+
+    healthy: bool = False
+    lag: float = math.inf
+    replayed: int = 0
+    checked_at: float = 0.0
+    last_error: str | None = None
+
+
+class Replica:
+    """engine of a read replica and the outcome of its last health check"""
+
+    def __init__(self, url: str) -> None:
+        self.url: str = url
+        parsed = make_url(url)
+        self.name: str = f"{parsed.host}:{parsed.port or 5432}/{parsed.database}"
+        self.engine: AsyncEngine | None = None
+        self.session = sessionmaker(class_=AsyncSession)  # type: ignore
+        self.health: ReplicaHealth = ReplicaHealth()
+        self.reads: int = 0
+
+    def connect(self) -> None:
+        """create engine, connections are opened by the first check"""
+
+        self.engine = open_engine(self.url)
+        self.session.configure(bind=self.engine)
+
+    async def check(self) -> None:
+        """refresh health, lag and replayed WAL position"""
+
+        try:
+            health = await asyncio.wait_for(
+                self._health(), Config.REPLICA_CHECK_TIMEOUT
+            )
+            if not health.standby:
+                raise ValueError("not a standby, it is not in recovery")
+            self.health = ReplicaHealth(
+                healthy=True,
+                lag=math.inf if health.lag is None else float(health.lag),
+                replayed=int(health.replayed),
+                checked_at=time.monotonic(),
+            )
+        except (DBAPIError, OSError, ValueError, asyncio.TimeoutError) as error:
+            self.fail(error)
+        REPLICA_LAG.labels(self.name).set(self.health.lag)
+
+    async def _health(self):
+        """run HEALTH_QUERY on a pooled connection"""
+
+        assert self.engine is not None
+        async with self.engine.connect() as connection:
+            return (await connection.execute(HEALTH_QUERY)).one()
+
+    def fail(self, error: BaseException) -> None:
+        """take replica out of rotation until its next successful check"""
+
+        self.health.healthy, self.health.lag = False, math.inf
+        self.health.last_error = repr(error)
+
+    def serves(self, position: float) -> bool:
+        """whether replica is healthy, recently checked, lags at most
+        REPLICA_MAX_LAG seconds and replayed WAL `position`
+        """
+
+        health: ReplicaHealth = self.health
+        return (
+            health.healthy
+            and health.lag <= Config.REPLICA_MAX_LAG
+            and time.monotonic() - health.checked_at <= Config.REPLICA_MAX_LAG
+            and health.replayed >= position
+        )
+
+    async def close(self) -> None:
+        """close every pooled connection"""
+
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = None
+
+    def stats(self) -> dict[str, str | int | float | bool | None]:
+        """health and reads served"""
+
+        health: ReplicaHealth = self.health
+        return {
+            "name": self.name,
+            "healthy": health.healthy,
+            "lag": None if math.isinf(health.lag) else round(health.lag, 3),
+            "replayed": health.replayed,
+            "reads": self.reads,
+            "lastError": health.last_error,
+        }
+
+
+class ReplicaSet:
+    """Read replicas of a worker and read-your-writes fences
+    Writes fence the users and titles they touch with the WAL position
+    after their commit, reads pick a replica which replayed their fences.
+    """
+
+    # fence of every title, taken by writes touching too many titles to
+    # fence one by one
+    ALL_TITLES: Final[tuple[str, None]] = ("title", None)
+    # fence of every read, taken when a write finds the fence store full
+    EVERYTHING: Final[tuple[str, None]] = ("all", None)
+
+    def __init__(self, urls: Iterable[str]) -> None:
+        self.replicas: list[Replica] = [Replica(url) for url in urls]
+        # key -> (WAL position, expiry), in expiry order as every fence
+        # lives for the same ttl
+        self.fences: OrderedDict[Hashable, tuple[float, float]] = OrderedDict()
+        self.primary_reads: dict[str, int] = {
+            "fenced": 0,
+            "unavailable": 0,
+            "failover": 0,
+        }
+        self._turn: itertools.count = itertools.count()
+        self._checks: BackgroundTask = BackgroundTask(self._run)
+
+    @staticmethod
+    def user(user_id: str) -> tuple[str, str]:
+        """fence key of writes made by a user"""
+
+        return ("user", user_id)
+
+    @staticmethod
+    def title(title: str) -> tuple[str, str]:
+        """fence key of writes to a title"""
+
+        return ("title", title)
+
+    def write_fences(
+        self, user_id: str, titles: Collection[str] | None
+    ) -> list[Hashable]:
+        """fence keys of a write by a user to titles, ALL_TITLES when they
+        are more than REPLICA_FENCE_MAX_TITLES or None for too many to list
+        """
+
+        if titles is None or len(titles) > Config.REPLICA_FENCE_MAX_TITLES:
+            return [self.user(user_id), self.ALL_TITLES]
+        return [self.user(user_id), *map(self.title, titles)]
+
+    async def start(self) -> None:
+        """connect replicas, check them once and keep checking them"""
+
+        if not self.replicas:
+            return
+        for replica in self.replicas:
+            replica.connect()
+        await self.check()
+        self._checks.start()
+
+    async def close(self) -> None:
+        """stop health checks and close replica pools"""
+
+        await self._checks.stop()
+        await asyncio.gather(*(replica.close() for replica in self.replicas))
+
+    async def check(self) -> None:
+        """check every replica concurrently"""
+
+        await asyncio.gather(*(replica.check() for replica in self.replicas))
+
+    async def _run(self) -> None:
+        """check replicas every REPLICA_CHECK_INTERVAL seconds"""
+
+        while True:
+            await asyncio.sleep(Config.REPLICA_CHECK_INTERVAL)
+            await self.check()
+
+    async def fence(self, db_session: AsyncSession, keys: Iterable[Hashable]) -> None:
+        """Fence keys with the WAL position after the commit of db_session
+        When the position cannot be read, keys are read from the primary
+        until the fence expires.
+        """
+
+        if not self.replicas:
+            return
+        self._expire()
+        fenced: dict[Hashable, float] = {key: self._position(key) for key in keys}
+        added: int = sum(key not in self.fences for key in fenced)
+        if added and len(self.fences) + added > Config.REPLICA_FENCE_MAX_SIZE:
+            # fence every read rather than dropping fences of other writes
+            fenced = {self.EVERYTHING: self._position(self.EVERYTHING)}
+        expires: float = (
+            time.monotonic() + Config.REPLICA_MAX_LAG + Config.REPLICA_CHECK_INTERVAL
+        )
+        # read from the primary until the position is known
+        for key in fenced:
+            self._store(key, math.inf, expires)
+        position: float = math.inf
+        try:
+            position = int((await db_session.execute(WAL_POSITION)).scalar_one())
+        except (DBAPIError, OSError):
+            pass
+        for key, previous in fenced.items():
+            self._store(key, max(previous, position), expires)
+
+    def _position(self, key: Hashable) -> float:
+        """WAL position fenced for key, 0 when it is not fenced"""
+
+        fence: tuple[float, float] | None = self.fences.get(key)
+        return fence[0] if fence is not None and fence[1] > time.monotonic() else 0
+
+    def _store(self, key: Hashable, position: float, expires: float) -> None:
+        """fence key until `expires`, keeping fences in expiry order"""
+
+        self.fences.pop(key, None)
+        self.fences[key] = (position, expires)
+
+    def _expire(self) -> None:
+        """drop expired fences"""
+
+        now: float = time.monotonic()
+        while self.fences and next(iter(self.fences.values()))[1] <= now:
+            self.fences.popitem(last=False)
+
+    def pick(self, keys: Iterable[Hashable]) -> Replica | None:
+        """replica serving the fences of keys, None to read the primary"""
+
+        if not self.replicas:
+            return None
+        position: float = max(self._position(key) for key in (*keys, self.EVERYTHING))
+        serving: list[Replica] = [
+            replica for replica in self.replicas if replica.serves(position)
+        ]
+        if not serving:
+            reason: str = (
+                "fenced"
+                if any(replica.serves(0) for replica in self.replicas)
+                else "unavailable"
+            )
+            self.primary_reads[reason] += 1
+            ROUTED_READS.labels("primary", reason).inc()
+            return None
+        replica: Replica = serving[next(self._turn) % len(serving)]
+        replica.reads += 1
+        ROUTED_READS.labels(replica.name, "replica").inc()
+        return replica
+
+    def failed(self, replica: Replica, error: BaseException) -> None:
+        """count a replica read retried on the primary, taking the replica
+        out of rotation when its connection broke
+        """
+
+        self.primary_reads["failover"] += 1
+        ROUTED_READS.labels("primary", "failover").inc()
+        if isinstance(error, OSError) or (
+            isinstance(error, DBAPIError) and error.connection_invalidated
+        ):
+            replica.fail(error)
+
+    def stats(self) -> dict[str, list | dict[str, int] | int]:
+        """replica health and reads sent to the primary instead"""
+
+        self._expire()
+        return {
+            "replicas": [replica.stats() for replica in self.replicas],
+            "primaryReads": dict(self.primary_reads),
+            "fences": len(self.fences),
+        }
+
+
+REPLICAS: ReplicaSet = ReplicaSet(Config.REPLICA_DATABASE_URLS)
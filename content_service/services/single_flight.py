@@ -0,0 +1,78 @@
+"""Handles coalescing of concurrent identical operations"""
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+from content_service.services.metrics import COALESCED_CALLS
+
+
+class SingleFlight:
+    """lets concurrent callers with the same key share one in-flight call
+    The first caller of a key starts the call as its own task, callers
+    arriving before it finishes await the same task and receive the same
+    result or exception. A caller being cancelled only cancels the shared
+    call once no other caller waits for it. Nothing is remembered after
+    the call finished, caching results is left to the caller.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self._waiters: dict[asyncio.Task, int] = {}
+        self.leaders: int = 0
+        self.followers: int = 0
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """await call(), or the call already in flight for key"""
+
+        task: asyncio.Task | None = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            self._waiters[task] = 0
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.leaders += 1
+            COALESCED_CALLS.labels(self.name, "leader").inc()
+        else:
+            self.followers += 1
+            COALESCED_CALLS.labels(self.name, "follower").inc()
+        self._waiters[task] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if not task.done():
+                # only reached when this caller got cancelled
+                self._waiters[task] -= 1
+                if not self._waiters[task]:
+                    if self._calls.get(key) is task:
+                        del self._calls[key]
+                    task.cancel()
+
+    def forget(self, key: Hashable) -> None:
+        """let callers arriving from now on start a new call for key
+        used after writes so later readers never join a call which may
+        have read the previous value.
+        """
+
+        self._calls.pop(key, None)
+
+    def clear(self) -> None:
+        """forget every key, see forget"""
+
+        self._calls.clear()
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        """drop finished call, marking its exception as retrieved"""
+
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        del self._waiters[task]
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, int]:
+        """calls in flight and how many callers shared one"""
+
+        return {
+            "inFlight": len(self._calls),
+            "leaders": self.leaders,
+            "followers": self.followers,
+        }
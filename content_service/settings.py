@@ -1,6 +1,7 @@
 """Handles configuration of environment variables"""
 from pathlib import Path
 from starlette.config import Config
+from starlette.datastructures import CommaSeparatedStrings
 
 CONFIG = Config(".env")
 BASE_DIR = Path(__file__).parent
@@ -16,13 +17,128 @@ DB_NAME = CONFIG("DB_NAME", cast=str, default="db_content")
 DB_USER = CONFIG("DB_USER", cast=str, default="postgres")
 DB_PASSWORD = CONFIG("DB_PASSWORD", cast=str, default="8045")
 
-DATABASE_URL = CONFIG(
-    "DATABASE_URL",
-    cast=str,
-    default=f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}",
-)
 ASYNC_DATABASE_URL = CONFIG(
     "ASYNC_DATABASE_URL",
     cast=str,
     default=f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}",
 )
+
+# Connection pool of each worker, timeouts are in seconds
+DB_POOL_SIZE = CONFIG("DB_POOL_SIZE", cast=int, default=10)
+DB_MAX_OVERFLOW = CONFIG("DB_MAX_OVERFLOW", cast=int, default=10)
+DB_POOL_TIMEOUT = CONFIG("DB_POOL_TIMEOUT", cast=float, default=30.0)
+DB_POOL_RECYCLE = CONFIG("DB_POOL_RECYCLE", cast=int, default=1800)
+DB_POOL_PRE_PING = CONFIG("DB_POOL_PRE_PING", cast=bool, default=True)
+DB_POOL_WARMUP = CONFIG("DB_POOL_WARMUP", cast=int, default=2)
+
+# Read replicas, comma separated urls like ASYNC_DATABASE_URL, none by default.
+# A replica serves reads while it lags at most REPLICA_MAX_LAG seconds, health
+# is checked every REPLICA_CHECK_INTERVAL seconds. Pools use DB_POOL_* settings.
+REPLICA_DATABASE_URLS = CONFIG(
+    "REPLICA_DATABASE_URLS", cast=CommaSeparatedStrings, default=""
+)
+REPLICA_MAX_LAG = CONFIG("REPLICA_MAX_LAG", cast=float, default=5.0)
+REPLICA_CHECK_INTERVAL = CONFIG("REPLICA_CHECK_INTERVAL", cast=float, default=1.0)
+REPLICA_CHECK_TIMEOUT = CONFIG("REPLICA_CHECK_TIMEOUT", cast=float, default=1.0)
+# Read-your-writes fences kept per worker. A write touching more than
+# REPLICA_FENCE_MAX_TITLES titles fences every title, a write finding the
+# store full sends every read to the primary until the fence expires.
+REPLICA_FENCE_MAX_SIZE = CONFIG("REPLICA_FENCE_MAX_SIZE", cast=int, default=10000)
+REPLICA_FENCE_MAX_TITLES = CONFIG("REPLICA_FENCE_MAX_TITLES", cast=int, default=1000)
+
+# User existence cache, ttl values are in seconds
+USER_CACHE_MAX_SIZE = CONFIG("USER_CACHE_MAX_SIZE", cast=int, default=10000)
+USER_CACHE_TTL = CONFIG("USER_CACHE_TTL", cast=float, default=60.0)
+USER_CACHE_NEGATIVE_TTL = CONFIG("USER_CACHE_NEGATIVE_TTL", cast=float, default=10.0)
+
+# Pooled client for internal services, timeouts are in seconds
+INTERNAL_MAX_CONNECTIONS = CONFIG("INTERNAL_MAX_CONNECTIONS", cast=int, default=100)
+INTERNAL_MAX_KEEPALIVE = CONFIG("INTERNAL_MAX_KEEPALIVE", cast=int, default=20)
+INTERNAL_KEEPALIVE_EXPIRY = CONFIG(
+    "INTERNAL_KEEPALIVE_EXPIRY", cast=float, default=30.0
+)
+INTERNAL_CONNECT_TIMEOUT = CONFIG("INTERNAL_CONNECT_TIMEOUT", cast=float, default=1.0)
+INTERNAL_READ_TIMEOUT = CONFIG("INTERNAL_READ_TIMEOUT", cast=float, default=3.0)
+INTERNAL_POOL_TIMEOUT = CONFIG("INTERNAL_POOL_TIMEOUT", cast=float, default=1.0)
+INTERNAL_RETRIES = CONFIG("INTERNAL_RETRIES", cast=int, default=2)
+INTERNAL_RETRY_BACKOFF = CONFIG("INTERNAL_RETRY_BACKOFF", cast=float, default=0.05)
+BREAKER_FAILURE_THRESHOLD = CONFIG("BREAKER_FAILURE_THRESHOLD", cast=int, default=5)
+BREAKER_RESET_TIMEOUT = CONFIG("BREAKER_RESET_TIMEOUT", cast=float, default=10.0)
+
+# Csv ingest, rows per COPY batch and background job workers
+INGEST_BATCH_SIZE = CONFIG("INGEST_BATCH_SIZE", cast=int, default=5000)
+INGEST_WORKERS = CONFIG("INGEST_WORKERS", cast=int, default=2)
+INGEST_MAX_QUEUED = CONFIG("INGEST_MAX_QUEUED", cast=int, default=20)
+INGEST_JOB_HISTORY = CONFIG("INGEST_JOB_HISTORY", cast=int, default=100)
+# uploads from INGEST_PARALLEL_MIN_BYTES on are parsed by INGEST_PARSE_PROCESSES
+# processes, 0 parses every upload in threads
+INGEST_PARSE_PROCESSES = CONFIG("INGEST_PARSE_PROCESSES", cast=int, default=2)
+INGEST_PARALLEL_MIN_BYTES = CONFIG(
+    "INGEST_PARALLEL_MIN_BYTES", cast=int, default=16 * 1024 * 1024
+)
+INGEST_MAX_REJECTIONS = CONFIG("INGEST_MAX_REJECTIONS", cast=int, default=100)
+
+# Local ranking of top content, refresh interval is in seconds
+RANKING_REFRESH_INTERVAL = CONFIG("RANKING_REFRESH_INTERVAL", cast=float, default=30.0)
+RANKING_MAX_PAGES = CONFIG("RANKING_MAX_PAGES", cast=int, default=100)
+
+# Read-through cache of single content reads, ttl is in seconds
+CONTENT_CACHE_MAX_SIZE = CONFIG("CONTENT_CACHE_MAX_SIZE", cast=int, default=10000)
+CONTENT_CACHE_MAX_BYTES = CONFIG(
+    "CONTENT_CACHE_MAX_BYTES", cast=int, default=64 * 1024 * 1024
+)
+CONTENT_CACHE_TTL = CONFIG("CONTENT_CACHE_TTL", cast=float, default=30.0)
+
+# Admission control per route class, concurrent requests and queued requests
+# beyond them, queue timeout and Retry-After are in seconds. Csv ingest is
+# shed while other classes hold LOW_PRIORITY_THRESHOLD requests or more.
+ADMISSION_READ_CONCURRENCY = CONFIG("ADMISSION_READ_CONCURRENCY", cast=int, default=64)
+ADMISSION_READ_QUEUE = CONFIG("ADMISSION_READ_QUEUE", cast=int, default=256)
+ADMISSION_FEED_CONCURRENCY = CONFIG("ADMISSION_FEED_CONCURRENCY", cast=int, default=16)
+ADMISSION_FEED_QUEUE = CONFIG("ADMISSION_FEED_QUEUE", cast=int, default=64)
+ADMISSION_WRITE_CONCURRENCY = CONFIG(
+    "ADMISSION_WRITE_CONCURRENCY", cast=int, default=16
+)
+ADMISSION_WRITE_QUEUE = CONFIG("ADMISSION_WRITE_QUEUE", cast=int, default=64)
+ADMISSION_EXPORT_CONCURRENCY = CONFIG(
+    "ADMISSION_EXPORT_CONCURRENCY", cast=int, default=4
+)
+ADMISSION_EXPORT_QUEUE = CONFIG("ADMISSION_EXPORT_QUEUE", cast=int, default=8)
+ADMISSION_INGEST_CONCURRENCY = CONFIG(
+    "ADMISSION_INGEST_CONCURRENCY", cast=int, default=4
+)
+ADMISSION_INGEST_QUEUE = CONFIG("ADMISSION_INGEST_QUEUE", cast=int, default=4)
+ADMISSION_QUEUE_TIMEOUT = CONFIG("ADMISSION_QUEUE_TIMEOUT", cast=float, default=1.0)
+ADMISSION_RETRY_AFTER = CONFIG("ADMISSION_RETRY_AFTER", cast=int, default=1)
+ADMISSION_LOW_PRIORITY_THRESHOLD = CONFIG(
+    "ADMISSION_LOW_PRIORITY_THRESHOLD", cast=int, default=32
+)
+
+# Responses of GZIP_MINIMUM_SIZE bytes or more are gzip compressed for clients
+# accepting it, level 1 (fastest) to 9 (smallest)
+GZIP_MINIMUM_SIZE = CONFIG("GZIP_MINIMUM_SIZE", cast=int, default=1024)
+GZIP_COMPRESS_LEVEL = CONFIG("GZIP_COMPRESS_LEVEL", cast=int, default=6)
+
+# Maximum titles accepted by batch reads, and by batch updates and deletes
+# which apply BATCH_MUTATION_CHUNK titles per transaction
+BATCH_MAX_TITLES = CONFIG("BATCH_MAX_TITLES", cast=int, default=1000)
+BATCH_MAX_MUTATIONS = CONFIG("BATCH_MAX_MUTATIONS", cast=int, default=10000)
+BATCH_MUTATION_CHUNK = CONFIG("BATCH_MUTATION_CHUNK", cast=int, default=1000)
+
+# Rows fetched per server side cursor round trip of content export
+EXPORT_BATCH_SIZE = CONFIG("EXPORT_BATCH_SIZE", cast=int, default=1000)
+
+# Change feed page size and how many seconds recent changes settle before
+# being served, covering writes racing the in progress transaction check.
+# Changes are held back while any transaction writing Content or tombstones
+# is open, from its start, so a long running ingest merge pauses the feed.
+CHANGES_PAGE_SIZE = CONFIG("CHANGES_PAGE_SIZE", cast=int, default=1000)
+CHANGES_SETTLE_SECONDS = CONFIG("CHANGES_SETTLE_SECONDS", cast=float, default=1.0)
+
+# Full text search page size and postgres ts_headline options of snippets
+SEARCH_PAGE_SIZE = CONFIG("SEARCH_PAGE_SIZE", cast=int, default=20)
+SEARCH_SNIPPET_OPTIONS = CONFIG(
+    "SEARCH_SNIPPET_OPTIONS",
+    cast=str,
+    default="MaxFragments=2, MaxWords=25, MinWords=8, StartSel=<b>, StopSel=</b>",
+)
@@ -0,0 +1,37 @@
+"""Malformed bodies of the batch content endpoints
+
+Bodies are validated before the user service or the database is asked, so
+these run without either.
+"""
+import pytest
+from starlette.testclient import TestClient
+from content_service.exceptions import InvalidBatchRequest
+from content_service.server import app
+
+BAD_REQUEST: int = 400
+
+
+@pytest.fixture
+def client() -> TestClient:
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("body", [b"{not json", b"\xff\xfe", b'{"titles": "a"}'])
+def test_fetch_contents_bad_body(client: TestClient, body: bytes) -> None:
+    response = client.post("/content/batch?userID=user", content=body)
+    assert response.status_code == BAD_REQUEST
+    assert response.json() == InvalidBatchRequest.error()
+
+
+@pytest.mark.parametrize("body", [b"{not json", b"\xff\xfe", b'{"contents": ["a"]}'])
+def test_update_contents_bad_body(client: TestClient, body: bytes) -> None:
+    response = client.request("PATCH", "/content/batch?userID=user", content=body)
+    assert response.status_code == BAD_REQUEST
+    assert response.json() == InvalidBatchRequest.error()
+
+
+@pytest.mark.parametrize("body", [b"{not json", b"\xff\xfe", b'{"titles": "a"}'])
+def test_delete_contents_bad_body(client: TestClient, body: bytes) -> None:
+    response = client.request("DELETE", "/content/batch?userID=user", content=body)
+    assert response.status_code == BAD_REQUEST
+    assert response.json() == InvalidBatchRequest.error()
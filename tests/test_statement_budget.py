@@ -0,0 +1,109 @@
+"""Statement budget of single content updates and deletes
+
+Runs against the database of ASYNC_DATABASE_URL and is skipped when it
+cannot be reached. The user check is answered from USER_CACHE.
+"""
+from datetime import datetime
+from typing import AsyncIterator
+import pytest
+from sqlalchemy import delete, event
+from sqlalchemy.exc import DBAPIError
+from content_service.models import Content, ContentTombstone, Database
+from content_service.services.content_service import ContentNotFound, ContentService
+from content_service.services.internal_client import InternalClient
+from content_service.services.replicas import ReplicaSet
+
+USER_ID: str = "statement_budget_user"
+TITLE: str = "statement_budget_title"
+# replicas are never connected, a configured one only adds the WAL
+# position read after commit
+REPLICA_URL: str = "postgresql+asyncpg://postgres@replica.invalid/db_content"
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+async def database() -> AsyncIterator[Database]:
+    database = Database()
+    try:
+        await database.connect()
+    except (DBAPIError, OSError) as error:
+        await database.close()
+        pytest.skip(f"database is not reachable: {error!r}")
+    ContentService.USER_CACHE.set(USER_ID, True, 60)
+    await _remove(database)
+    async with database.session() as db_session:
+        db_session.add(
+            Content(
+                title=TITLE,
+                story="story",
+                publishedDate=datetime(2023, 1, 1),
+                userID=USER_ID,
+            )
+        )
+        await db_session.commit()
+    yield database
+    await _remove(database)
+    await database.close()
+
+
+async def _remove(database: Database) -> None:
+    async with database.session() as db_session:
+        await db_session.execute(delete(Content).where(Content.title == TITLE))
+        await db_session.execute(
+            delete(ContentTombstone).where(ContentTombstone.title == TITLE)
+        )
+        await db_session.commit()
+
+
+class StatementCounter:  # pylint: disable=too-few-public-methods
+    """statements sent to the database while listening"""
+
+    def __init__(self, database: Database) -> None:
+        assert database.engine is not None
+        self.statements: list[str] = []
+        event.listen(database.engine.sync_engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args) -> None:
+        self.statements.append(args[2])
+
+
+def _service(database: Database, replicas: list[str]) -> ContentService:
+    return ContentService(database.session, InternalClient(), ReplicaSet(replicas))
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("replicas, budget", [([], 1), ([REPLICA_URL], 2)])
+async def test_update_content(
+    database: Database, replicas: list[str], budget: int
+) -> None:
+    svc: ContentService = _service(database, replicas)
+    counter: StatementCounter = StatementCounter(database)
+    content = await svc.update_content_service(TITLE, "new story", USER_ID)
+    assert content["story"] == "new story"
+    assert len(counter.statements) == budget, counter.statements
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("replicas, budget", [([], 1), ([REPLICA_URL], 2)])
+async def test_delete_content(
+    database: Database, replicas: list[str], budget: int
+) -> None:
+    svc: ContentService = _service(database, replicas)
+    counter: StatementCounter = StatementCounter(database)
+    await svc.delete_content_service(TITLE, USER_ID)
+    assert len(counter.statements) == budget, counter.statements
+
+
+@pytest.mark.anyio
+async def test_missing_content(database: Database) -> None:
+    svc: ContentService = _service(database, [REPLICA_URL])
+    counter: StatementCounter = StatementCounter(database)
+    with pytest.raises(ContentNotFound):
+        await svc.update_content_service("statement_budget_missing", "", USER_ID)
+    with pytest.raises(ContentNotFound):
+        await svc.delete_content_service("statement_budget_missing", USER_ID)
+    assert len(counter.statements) == 2, counter.statements